@@ -0,0 +1,135 @@
+import json
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional
+
+from research_mcp_agent.dedup import MinHashIndex
+from research_mcp_agent.metrics import metrics
+
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends from concurrent processes are not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateResultStore:
+    def __init__(self, directory: Path, threshold: float = 0.85) -> None:
+        """
+        Results of processed inputs, looked up by near-duplicate text.
+
+        The same paper often arrives several times (arXiv URL, PDF, pasted text) with
+        slightly different extracted text, so an exact hash misses it. A MinHash/LSH
+        index over the processed inputs finds these near-duplicates, and their stored
+        result is returned without running the graph again.
+
+        Every processed input is appended to `results.jsonl` under directory, as one
+        line with its key, MinHash signature and result, so recording a result
+        never rewrites the earlier ones. Stores written before the signatures were
+        kept in the lines also read them from `index.npz`.
+
+        Several processes (the workers of a pool) may share the store: appends hold
+        an exclusive lock on the file, and every lookup first reads the lines the
+        other processes appended since the last one.
+
+        Args:
+            directory (Path): Where the index and the results are stored.
+            threshold (float): Estimated Jaccard similarity above which an input is
+                treated as a duplicate.
+        """
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.npz"
+        self.results_path = self.directory / "results.jsonl"
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._index: Optional[MinHashIndex] = None
+        self._results: Dict[str, dict] = {}
+        # Bytes of results.jsonl already read
+        self._offset = 0
+
+    def _load(self) -> MinHashIndex:
+        """Load the index on first use, then the results appended since the last call."""
+        if self._index is None:
+            if self.index_path.exists():
+                self._index = MinHashIndex.load(self.index_path, threshold=self.threshold)
+            else:
+                self._index = MinHashIndex(threshold=self.threshold)
+
+        if self.results_path.exists():
+            with open(self.results_path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            # A line still being written by another process is read next time
+            end = data.rfind(b"\n") + 1
+            self._offset += end
+
+            for line in data[:end].decode("utf-8").splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    self._results[record["key"]] = record["result"]
+                    if "signature" in record and record["key"] not in self._index:
+                        self._index.add(record["key"], np.asarray(record["signature"], dtype=np.uint32))
+
+        return self._index
+
+    def find(self, input_text: str, key_suffix: str = "") -> Optional[dict]:
+        """
+        Return the stored result of the most similar processed input, if any.
+
+        Args:
+            input_text (str): The new input.
+            key_suffix (str): Only consider keys ending with it (e.g. the run mode).
+
+        Returns:
+            Optional[dict]: The stored result, None when the input is new.
+        """
+        with self._lock:
+            index = self._load()
+            for key, similarity in index.query(index.signature(input_text)):
+                if key.endswith(key_suffix) and key in self._results:
+                    logger.info(f"Near-duplicate of a processed input (similarity {similarity:.2f})")
+                    metrics.increment("dedup.hits")
+                    return self._results[key]
+
+        metrics.increment("dedup.misses")
+        return None
+
+    def add(self, key: str, input_text: str, result: dict) -> None:
+        """
+        Record the result of a processed input.
+
+        Args:
+            key (str): Identifier of the input (the result of `find` is looked up by it).
+            input_text (str): The input text.
+            result (dict): The agent output.
+        """
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.results_path, "ab") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # Another process may have recorded the same input meanwhile
+                    index = self._load()
+                    if key in self._results:
+                        return
+
+                    signature = index.signature(input_text)
+                    record = {"key": key, "signature": signature.tolist(), "result": result}
+                    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    f.flush()
+                    # Everything before this line was read by `_load` under the lock
+                    self._offset += len(line)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+            self._results[key] = result
+            index.add(key, signature)
@@ -1,7 +1,19 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from research_mcp_agent.agent.schemas import AgentState
-from research_mcp_agent.agent.nodes import classifier_node, extractor_node, reviewer_node
+from research_mcp_agent.agent.nodes import classifier_node, extractor_node, reviewer_node, extract_review_node
+from research_mcp_agent.agent.nodes import condense_node, MAP_REDUCE_THRESHOLD
+from research_mcp_agent.agent.prefix import text_hash
+from research_mcp_agent.agent.duplicates import DuplicateResultStore
+from research_mcp_agent.io import read_file_content
+from research_mcp_agent.metrics import metrics
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
 import asyncio
+import os
+import time
 
 import logging
 
@@ -12,45 +24,157 @@ logger.info("Initializing workflow graph")
 workflow = StateGraph(AgentState)
 
 # 2. Add Nodes
+workflow.add_node("condense", condense_node)
 workflow.add_node("classify", classifier_node)
 workflow.add_node("extract", extractor_node)
 workflow.add_node("review", reviewer_node)
+workflow.add_node("extract_review", extract_review_node)
+
+
+def route_input(state: AgentState) -> str:
+    """Condense papers over the length threshold, send the others straight to the classifier."""
+    return "condense" if len(state["input_text"]) > MAP_REDUCE_THRESHOLD else "classify"
+
+
+def route_after_classify(state: AgentState) -> str:
+    """Pick the separate extract/review nodes or the single combined node."""
+    return "extract_review" if state.get("combined") else "extract"
+
 
 # 3. Define Edges (The Logic Flow)
-# Flow: Start -> Classify -> Extract -> Review -> End
-workflow.set_entry_point("classify")
-workflow.add_edge("classify", "extract")
+# Flow: Start -> [Condense] -> Classify -> Extract -> Review -> End
+#   or: Start -> [Condense] -> Classify -> Extract+Review -> End (combined mode)
+workflow.add_conditional_edges(START, route_input, ["condense", "classify"])
+workflow.add_edge("condense", "classify")
+workflow.add_conditional_edges("classify", route_after_classify, ["extract", "extract_review"])
 workflow.add_edge("extract", "review")
 workflow.add_edge("review", END)
+workflow.add_edge("extract_review", END)
 
 # 4. Compile the Graph
 app = workflow.compile()
 logger.info("Workflow graph compilation complete")
 
+# Local checkpoint store used by batch runs
+CHECKPOINT_DB = Path(__file__).parent.parent / "checkpoints.sqlite"
+
+# Inputs whose estimated Jaccard similarity with an already processed input is
+# above DEDUP_THRESHOLD reuse its stored result instead of running the graph.
+DEDUP_DIR = Path(__file__).parent.parent / "dedup"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+duplicates = DuplicateResultStore(DEDUP_DIR, threshold=DEDUP_THRESHOLD)
+
+
+@asynccontextmanager
+async def open_checkpointer(path: Path = CHECKPOINT_DB) -> AsyncIterator[BaseCheckpointSaver]:
+    """
+    Open the SQLite checkpointer that persists the graph state after every node.
+
+    Args:
+        path (Path): The SQLite database file.
+    """
+    async with AsyncSqliteSaver.from_conn_string(str(path)) as checkpointer:
+        yield checkpointer
+
+
+def _run_mode(combined: bool) -> str:
+    return "combined" if combined else "separate"
+
+
+def thread_id(input_text: str, combined: bool = False) -> str:
+    """Checkpoint key of an article: the hash of its text and the run mode."""
+    return f"{text_hash(input_text)}-{_run_mode(combined)}"
+
+
+def _is_complete(output: dict) -> bool:
+    """Whether an output is worth reusing, i.e. no node fell back to its error value."""
+    return (
+        output.get("area") not in (None, "unclassified")
+        and bool(output.get("extraction"))
+        and not str(output.get("review_markdown") or "Erro").startswith("Erro")
+    )
+
+
+def find_duplicate(input_text: str, combined: bool = False) -> Optional[dict]:
+    """Stored output of a near-duplicate of input_text processed in the same mode, if any."""
+    return duplicates.find(input_text, key_suffix=f"-{_run_mode(combined)}")
+
+
+def record_output(input_text: str, output: dict, combined: bool = False) -> None:
+    """Remember a complete output so near-duplicate inputs can reuse it."""
+    if _is_complete(output):
+        duplicates.add(thread_id(input_text, combined), input_text, output)
+
+
+async def _run_checkpointed(initial_state: AgentState, checkpointer: BaseCheckpointSaver) -> dict:
+    """
+    Run the graph with checkpointing, keyed by the input hash.
+
+    Finished articles are returned from the checkpoint without any LLM call, and
+    interrupted ones resume from the last completed node.
+    """
+    checkpointed_app = workflow.compile(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": thread_id(initial_state["input_text"], initial_state["combined"])}}
+
+    snapshot = await checkpointed_app.aget_state(config)
+    if snapshot.values and not snapshot.next:
+        logger.info("Article already processed, reusing the checkpointed result")
+        metrics.increment("checkpoint.finished_skips")
+        return snapshot.values
+
+    if snapshot.next:
+        logger.info(f"Resuming interrupted run at node(s): {list(snapshot.next)}")
+        metrics.increment("checkpoint.resumes")
+        return await checkpointed_app.ainvoke(None, config)
+
+    return await checkpointed_app.ainvoke(initial_state, config)
+
+
 # --- Helper Function to Run the Agent ---
-async def agent_workflow(input_text: str):
+async def agent_workflow(input_text: str, combined: bool = False,
+                         checkpointer: Optional[BaseCheckpointSaver] = None, dedup: bool = True):
     """
     Main entry point to call the agent.
+
+    Args:
+        input_text (str): The text of the research paper to process.
+        combined (bool): Produce the extraction and the review in a single LLM call.
+        checkpointer (BaseCheckpointSaver, optional): Persist the state after each node
+            so that reruns skip finished articles and resume interrupted ones.
+        dedup (bool): Return the stored output of a near-duplicate input (the same
+            paper read from another source) instead of running the graph.
     """
     logger.info("=" * 70)
     logger.info("STARTING AGENT WORKFLOW")
     logger.info("=" * 70)
     logger.info(f"Input text length: {len(input_text)} characters")
 
+    if dedup:
+        stored_output = find_duplicate(input_text, combined)
+        if stored_output is not None:
+            logger.info("Reusing the output of a near-duplicate input, graph not run")
+            return stored_output
+
     initial_state = AgentState(
         input_text=input_text,
+        working_text=None,
+        combined=combined,
         area=None,
         extraction=None,
         review_markdown=None,
     )
     
     # Run the graph asynchronously
-    result = await app.ainvoke(initial_state)
+    if checkpointer is None:
+        result = await app.ainvoke(initial_state)
+    else:
+        result = await _run_checkpointed(initial_state, checkpointer)
 
     logger.info("Graph execution completed")
     logger.info(f"Final area: {result.get('area', 'N/A')}")
     logger.info(f"Extraction present: {result.get('extraction') is not None}")
     logger.info(f"Review present: {result.get('review_markdown') is not None}")
+    metrics.log()
     
     # Format the final output
     final_output = {
@@ -58,6 +182,7 @@ async def agent_workflow(input_text: str):
         "extraction": result["extraction"],
         "review_markdown": result["review_markdown"]
     }
+    record_output(input_text, final_output, combined)
 
     logger.info("=" * 70)
     logger.info("AGENT WORKFLOW COMPLETED SUCCESSFULLY")
@@ -66,18 +191,180 @@ async def agent_workflow(input_text: str):
     return final_output
 
 
-def run_graph(paper_text: str):
+# Node whose model tokens are streamed as they arrive
+STREAMED_NODE = "review"
+
+
+async def stream_workflow(input_text: str, combined: bool = False,
+                          dedup: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the agent and yield every result as soon as it is available.
+
+    Built on `app.astream` with the 'updates' and 'messages' stream modes, so the
+    caller does not wait for the whole pipeline: the area is known after the
+    classifier and the review is readable while the model is still writing it.
+
+    Args:
+        input_text (str): The text of the research paper to process.
+        combined (bool): Produce the extraction and the review in a single LLM call
+            (the review then arrives whole, with no token events).
+        dedup (bool): Replay the stored output of a near-duplicate input instead of
+            running the graph.
+
+    Yields:
+        Tuple[str, Any]: (event, value) pairs, in order of availability:
+            - ('area', str) when the classifier completes;
+            - ('review_token', str) for every review token the model produces;
+            - ('extraction', dict) and ('review_markdown', str) when their node completes;
+            - ('result', dict) with the final output, always last.
+    """
+    logger.info("=" * 70)
+    logger.info("STARTING AGENT WORKFLOW (STREAMING)")
+    logger.info("=" * 70)
+    logger.info(f"Input text length: {len(input_text)} characters")
+
+    stored_output = find_duplicate(input_text, combined) if dedup else None
+    if stored_output is not None:
+        logger.info("Reusing the output of a near-duplicate input, graph not run")
+        for key, value in stored_output.items():
+            yield key, value
+        yield "result", stored_output
+        return
+
+    initial_state = AgentState(
+        input_text=input_text,
+        working_text=None,
+        combined=combined,
+        area=None,
+        extraction=None,
+        review_markdown=None,
+    )
+
+    start = time.perf_counter()
+    first_result = True
+    final_output = {"area": None, "extraction": None, "review_markdown": None}
+
+    # subgraphs=True: the review tokens come from the agent graph run inside the node
+    async for namespace, mode, chunk in app.astream(initial_state, stream_mode=["updates", "messages"],
+                                                    subgraphs=True):
+        if mode == "messages":
+            message, _ = chunk
+            if namespace and namespace[0].split(":")[0] == STREAMED_NODE and message.text:
+                yield "review_token", message.text
+            continue
+
+        # Node updates of the nested agent graphs are internal, only graph nodes count
+        if namespace:
+            continue
+
+        for node, update in chunk.items():
+            for key in final_output:
+                if (update or {}).get(key) is None:
+                    continue
+                final_output[key] = update[key]
+
+                if first_result:
+                    metrics.observe("stream.time_to_first_result_seconds", time.perf_counter() - start)
+                    first_result = False
+                logger.info(f"Node '{node}' produced '{key}'")
+                yield key, update[key]
+
+    metrics.observe("stream.total_seconds", time.perf_counter() - start)
+    metrics.log()
+    record_output(input_text, final_output, combined)
+
+    logger.info("=" * 70)
+    logger.info("AGENT WORKFLOW COMPLETED SUCCESSFULLY")
+    logger.info("=" * 70)
+
+    yield "result", final_output
+
+
+def run_stream_graph(paper_text: str, on_event: Callable[[str, Any], None], combined: bool = False,
+                     dedup: bool = True) -> dict:
+    """
+    Synchronous wrapper around `stream_workflow`.
+    Args:
+        paper_text (str): The text of the research paper to process.
+        on_event (Callable[[str, Any], None]): Called with every (event, value) pair.
+        combined (bool): Produce the extraction and the review in a single LLM call.
+        dedup (bool): Replay the stored output of a near-duplicate input.
+    Returns:
+        dict: The final output from the agent workflow.
+    """
+    async def consume() -> dict:
+        result = {}
+        async for event, value in stream_workflow(paper_text, combined=combined, dedup=dedup):
+            on_event(event, value)
+            if event == "result":
+                result = value
+        return result
+
+    return asyncio.run(consume())
+
+
+def run_graph(paper_text: str, combined: bool = False, dedup: bool = True):
     """
     Synchronous wrapper to run the agent with the provided paper text.
     Args:
         paper_text (str): The text of the research paper to process.
+        combined (bool): Produce the extraction and the review in a single LLM call.
+        dedup (bool): Return the stored output of a near-duplicate input.
     Returns:
         dict: The final output from the agent workflow.
     """
-    output = asyncio.run(agent_workflow(paper_text))
+    output = asyncio.run(agent_workflow(paper_text, combined=combined, dedup=dedup))
     return output
 
 
+async def batch_workflow(file_paths: List[str], combined: bool = False,
+                         on_result: Optional[Callable[[str, dict], None]] = None,
+                         dedup: bool = True) -> Dict[str, int]:
+    """
+    Process several articles in one event loop, checkpointing every node.
+
+    A rerun after a crash skips the articles that already finished and resumes the
+    interrupted one from its last completed node, without paying again for the LLM
+    calls that already succeeded.
+
+    Args:
+        file_paths (List[str]): Input files (.pdf, .url or text).
+        combined (bool): Produce the extraction and the review in a single LLM call.
+        on_result (Callable[[str, dict], None], optional): Called with the file path
+            and the output of every successful article.
+        dedup (bool): Reuse the output of near-duplicate inputs (the same paper
+            given as PDF and arXiv URL, for instance).
+
+    Returns:
+        Dict[str, int]: Number of 'processed' and 'failed' articles.
+    """
+    summary = {"processed": 0, "failed": 0}
+
+    async with open_checkpointer() as checkpointer:
+        for file_path in file_paths:
+            try:
+                input_text = read_file_content(file_path)
+                output = await agent_workflow(input_text, combined=combined, checkpointer=checkpointer,
+                                              dedup=dedup)
+                if on_result is not None:
+                    on_result(file_path, output)
+                summary["processed"] += 1
+            except Exception as e:
+                logger.error(f"Failed to process {file_path}: {e}")
+                summary["failed"] += 1
+
+    logger.info(f"Batch completed: {summary}")
+    return summary
+
+
+def run_batch_graph(file_paths: List[str], combined: bool = False,
+                    on_result: Optional[Callable[[str, dict], None]] = None, dedup: bool = True) -> Dict[str, int]:
+    """
+    Synchronous wrapper around `batch_workflow`.
+    """
+    return asyncio.run(batch_workflow(file_paths, combined=combined, on_result=on_result, dedup=dedup))
+
+
 if __name__ == "__main__":
     from research_mcp_agent.agent.prompts import RANDOM_PAPER
     import json
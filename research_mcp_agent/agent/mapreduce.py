@@ -0,0 +1,100 @@
+import asyncio
+from typing import List
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable
+
+from research_mcp_agent.agent.prompts import MAP_PROMPT, REDUCE_PROMPT
+from research_mcp_agent.ingestion.indexer import chunk_text_by_sentences
+from research_mcp_agent.metrics import metrics
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def split_into_sections(text: str, max_chars: int, sentences_per_chunk: int = 8) -> List[str]:
+    """
+    Split a long text into sections of at most max_chars, never inside a sentence.
+
+    Uses the ingestion chunker (without overlap) and packs consecutive chunks into
+    sections until the size limit is reached.
+
+    Args:
+        text (str): The text to split.
+        max_chars (int): Target maximum size of a section, in characters.
+        sentences_per_chunk (int): Granularity of the packing.
+
+    Returns:
+        List[str]: The sections, in document order.
+    """
+    sections: List[str] = []
+    current = ""
+    for chunk in chunk_text_by_sentences(text, max_sentences=sentences_per_chunk, overlap=0):
+        if current and len(current) + len(chunk) + 1 > max_chars:
+            sections.append(current)
+            current = chunk
+        else:
+            current = f"{current} {chunk}" if current else chunk
+
+    if current:
+        sections.append(current)
+
+    return sections
+
+
+async def _map_section(llm: Runnable, section: str, index: int, total: int,
+                       semaphore: asyncio.Semaphore) -> str:
+    """Condense one section, holding a concurrency slot for the duration of the call."""
+    async with semaphore:
+        with metrics.timer("mapreduce.map_seconds"):
+            response = await llm.ainvoke([
+                SystemMessage(content=MAP_PROMPT),
+                HumanMessage(content=f"Section {index + 1} of {total}:\n\n{section}"),
+            ])
+
+    return response.text
+
+
+async def map_reduce(text: str, llm: Runnable, section_chars: int = 60_000,
+                     target_chars: int = 100_000, max_concurrency: int = 4) -> str:
+    """
+    Condense a text that is too long to send whole to every node.
+
+    Map: the text is split into sections that are condensed concurrently (at most
+    max_concurrency calls in flight), keeping what the classifier, extractor and
+    reviewer need. Reduce: the partial notes are joined in document order; if the
+    result is still above target_chars, it goes through another map-reduce round,
+    otherwise a final call merges the notes into one coherent document.
+
+    Args:
+        text (str): The full input text.
+        llm (Runnable): The chat model used for the map and reduce calls (possibly with retries).
+        section_chars (int): Maximum size of a section sent to one map call.
+        target_chars (int): Size under which the notes are reduced in a single call.
+        max_concurrency (int): Maximum number of concurrent map calls.
+
+    Returns:
+        str: The condensed document.
+    """
+    sections = split_into_sections(text, max_chars=section_chars)
+    logger.info(f"Map-reduce: {len(text)} characters split into {len(sections)} sections")
+    metrics.increment("mapreduce.sections", len(sections))
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    notes = await asyncio.gather(*[
+        _map_section(llm, section, i, len(sections), semaphore) for i, section in enumerate(sections)
+    ])
+    merged = "\n\n".join(f"### Section {i + 1}\n{note}" for i, note in enumerate(notes))
+
+    # Another round if the notes themselves are still too long (and still shrinking)
+    if len(merged) > target_chars and len(sections) > 1 and len(merged) < len(text):
+        return await map_reduce(merged, llm, section_chars, target_chars, max_concurrency)
+
+    with metrics.timer("mapreduce.reduce_seconds"):
+        response = await llm.ainvoke([
+            SystemMessage(content=REDUCE_PROMPT),
+            HumanMessage(content=merged),
+        ])
+
+    return response.text
@@ -1,16 +1,33 @@
 from dotenv import load_dotenv
 from langchain.agents import create_agent
+from langchain.agents.middleware import ModelRetryMiddleware
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents.structured_output import ToolStrategy
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_mcp_adapters.tools import load_mcp_tools
+from langchain_core.messages import BaseMessage, ToolMessage
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
 
 from research_mcp_agent.agent.prompts import RANDOM_PAPER
 from research_mcp_agent.agent.prompts import CLASSIFIER_PROMPT, EXTRACTION_PROMPT, REVIEWER_PROMPT
-from research_mcp_agent.agent.schemas import ClassifierResponse, ExtractionResponse
+from research_mcp_agent.agent.prompts import EXTRACTION_REVIEW_PROMPT
+from research_mcp_agent.agent.schemas import ClassifierResponse, ExtractionResponse, ExtractionReviewResponse
 from research_mcp_agent.agent.schemas import AgentState
-
+from research_mcp_agent.agent.mapreduce import map_reduce
+from research_mcp_agent.agent.prefix import PromptPrefixCache
+from research_mcp_agent.agent.ratelimit import AIMDConcurrencyController, RateLimitCallbackHandler, RateLimiter
+from research_mcp_agent.agent.structured import count_schema_retries, parse_structured
+from research_mcp_agent.agent.tiered import parse_search_results, tier_queries, vote
+from research_mcp_agent.metrics import metrics
+
+import asyncio
 import logging
+import os
+import re
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -18,12 +35,60 @@ logger = logging.getLogger(__name__)
 # Logging environment variables
 load_dotenv()
 
+# Client-side throttling shared by every node: requests and tokens per minute,
+# plus a concurrency limit that backs off on 429s and slow calls.
+rate_limiter = RateLimiter(
+    requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")),
+    tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000")),
+    controller=AIMDConcurrencyController(
+        initial_limit=int(os.getenv("LLM_INITIAL_CONCURRENCY", "4")),
+        max_limit=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+    ),
+)
+
+# A 429 retried inside the provider client never reaches the limiter, which then
+# cannot back off: the client makes a single attempt, and failed calls are retried
+# up to LLM_MAX_RETRIES times as new calls, each admitted by the limiter and
+# reported to it.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",
     temperature=0,
-    max_retries=2
+    # Number of attempts: 0 would mean the Google SDK default, which retries
+    max_retries=1,
+    callbacks=[RateLimitCallbackHandler(rate_limiter)],
 )
 
+# Retries of the agents' model calls, and of the direct calls
+model_retry = ModelRetryMiddleware(max_retries=LLM_MAX_RETRIES, on_failure="error")
+
+
+def _with_retries(runnable: Runnable) -> Runnable:
+    """Retry failed calls of a model runnable outside the provider client, see LLM_MAX_RETRIES."""
+    return runnable.with_retry(stop_after_attempt=LLM_MAX_RETRIES + 1)
+
+# 'native' asks the provider for schema-constrained JSON and repairs near misses
+# locally; 'tool' uses LangChain's ToolStrategy, which re-prompts on invalid output.
+STRUCTURED_OUTPUT_MODE = os.getenv("STRUCTURED_OUTPUT_MODE", "native")
+
+# Inputs longer than this (in characters) are condensed with map-reduce before
+# the LLM nodes run; the map calls run at most MAP_REDUCE_CONCURRENCY at a time.
+MAP_REDUCE_THRESHOLD = int(os.getenv("MAP_REDUCE_THRESHOLD", "200000"))
+MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+
+# Classification tiers, cheapest first: 'abstract' and 'sections' vote with the
+# areas retrieved for the title/abstract and for passages of the whole paper (no
+# LLM call), 'agent' runs the classifier agent on the full text. A retrieval tier
+# settles the area when its vote share reaches CLASSIFIER_CONFIDENCE.
+CLASSIFIER_TIERS = [tier.strip() for tier in os.getenv("CLASSIFIER_TIERS", "abstract,sections,agent").split(",")]
+CLASSIFIER_CONFIDENCE = float(os.getenv("CLASSIFIER_CONFIDENCE", "0.8"))
+CLASSIFIER_TIER_RESULTS = int(os.getenv("CLASSIFIER_TIER_RESULTS", "3"))
+
+# Shared [system, article] prefix so provider-side context caching applies
+# across the classifier, extractor and reviewer calls on the same article.
+prefix_cache = PromptPrefixCache()
+
 client = MultiServerMCPClient(
     {
         "research_article": {
@@ -35,50 +100,248 @@ client = MultiServerMCPClient(
 )
 
 
-async def classifier_node(state: AgentState) -> AgentState:
-    """
-    Agent 1: The Classifier.
-    Classifies the input article into one of the existing areas.
+# Tools of a long-lived MCP session opened by `warm_mcp_session`. When unset,
+# every classifier call starts its own MCP server session.
+_warm_tools: ContextVar[Optional[List]] = ContextVar("warm_mcp_tools", default=None)
+
+
+@asynccontextmanager
+async def warm_mcp_session() -> AsyncIterator[List]:
     """
-    logger.info("=" * 50)
-    logger.info("CLASSIFIER NODE - Starting")
+    Keep one MCP server session open for the duration of the block.
 
-    input_message = {"messages": [{"role": "user", "content": state["input_text"]}]}
+    Classifier calls made inside the block (including from graph nodes) reuse its
+    tools instead of spawning the MCP server and loading the index for every
+    article. Used by long-running workers.
+    """
+    async with client.session("research_article") as session:
+        tools = await load_mcp_tools(session)
+        logger.info(f"Opened warm MCP session with {len(tools)} tools")
+        token = _warm_tools.set(tools)
+        try:
+            yield tools
+        finally:
+            _warm_tools.reset(token)
+
+
+@asynccontextmanager
+async def _mcp_tools() -> AsyncIterator[List]:
+    """The tools of the warm MCP session, or of a session opened for this call."""
+    tools = _warm_tools.get()
+    if tools is not None:
+        yield tools
+        return
 
     async with client.session("research_article") as session:
         tools = await load_mcp_tools(session)
         logger.info(f"Loaded {len(tools)} MCP tools")
+        yield tools
+
+
+def _article_text(state: AgentState) -> str:
+    """The text the LLM nodes work on: the condensed version for long papers."""
+    return state.get("working_text") or state["input_text"]
+
+
+async def condense_node(state: AgentState) -> AgentState:
+    """
+    Agent 0: The Condenser.
+    Condenses papers longer than MAP_REDUCE_THRESHOLD with concurrent map-reduce
+    calls, so the other nodes never send the whole paper in one huge request.
+    """
+    logger.info("=" * 50)
+    logger.info("CONDENSE NODE - Starting")
 
+    with metrics.timer("mapreduce.total_seconds"):
+        working_text = await map_reduce(state["input_text"], _with_retries(llm),
+                                        max_concurrency=MAP_REDUCE_CONCURRENCY)
+    logger.info(f"Condensed {len(state['input_text'])} characters into {len(working_text)}")
+
+    logger.info("CONDENSE NODE - Completed")
+    logger.info("=" * 50)
+
+    return {"working_text": working_text}
+
+
+def _retrieved_areas(messages: List[BaseMessage]) -> Dict[str, str]:
+    """The areas of the articles returned to the classifier agent by its tools, by normalized name."""
+    areas = {}
+    for message in messages:
+        if not isinstance(message, ToolMessage) or message.name not in ("search_articles", "get_article_content"):
+            continue
+        for article in parse_search_results(message.content):
+            area = article.get("area") if isinstance(article, dict) else None
+            if area and area != "Unknown":
+                areas[re.sub(r"[^a-z0-9]", "", area.lower())] = area
+    return areas
+
+
+def _validate_area(answer: str, messages: List[BaseMessage]) -> str:
+    """
+    Map the classifier's answer onto one of the areas it retrieved.
+
+    Raises:
+        ValueError: If the answer is not one of those areas, e.g. a prose answer
+            taken as the area by the bare-answer fallback of `parse_structured`.
+    """
+    areas = _retrieved_areas(messages)
+    area = areas.get(re.sub(r"[^a-z0-9]", "", answer.lower()))
+    if area is None:
+        raise ValueError(f"Answer {answer[:100]!r} is not one of the retrieved areas {sorted(areas.values())}")
+    return area
+
+
+async def _classify_with_agent(state: AgentState, tools: List) -> Optional[str]:
+    """
+    Run the classifier agent on the article; it may search and read stored articles.
+    Returns None when the agent gives no valid area (see `_validate_area`).
+    """
+    input_message = {"messages": prefix_cache.messages(_article_text(state), CLASSIFIER_PROMPT)}
+
+    if STRUCTURED_OUTPUT_MODE == "native":
+        # The final answer is parsed locally instead of through a schema tool
+        agent = create_agent(
+            model=llm,
+            tools=tools,
+            middleware=[model_retry],
+        )
+    else:
         agent = create_agent(
             model=llm,
             tools=tools,
-            system_prompt=CLASSIFIER_PROMPT,
             response_format=ToolStrategy(ClassifierResponse),
+            middleware=[model_retry],
         )
 
-        response = await agent.ainvoke(input_message)
-        logger.info("Classifier agent response received")
+    response = await agent.ainvoke(input_message)
+    prefix_cache.record_usage(response["messages"], "classifier")
+    logger.info("Classifier agent response received")
+
+    try:    
+        if STRUCTURED_OUTPUT_MODE == "native":
+            structured_response = parse_structured(response["messages"][-1].text, ClassifierResponse)
+        else:
+            metrics.increment("structured_output.classifier.retries",
+                              count_schema_retries(response["messages"], ClassifierResponse))
+            structured_response = response["structured_response"]
 
-        try:    
-            # Convert the Pydantic object to a standard Python dictionary.
-            final_json_dict = response["structured_response"].model_dump()
-            
-            area = final_json_dict["area"]
-            logger.info(f"Classification successful: area='{area}'")
-        except Exception as e:
-            logger.error(f"Classification failed: {str(e)}")
+        # Convert the Pydantic object to a standard Python dictionary.
+        final_json_dict = structured_response.model_dump()
+
+        # Only an area of the stored articles is a classification
+        area = final_json_dict["area"] = _validate_area(final_json_dict["area"], response["messages"])
+        logger.info(f"Classification successful: area='{area}'")
+    except Exception as e:
+        logger.error(f"Classification failed: {str(e)}")
+        metrics.increment("structured_output.classifier.failures")
+
+        # No area: the classifier keeps the best earlier tier's area, or 'unclassified'
+        final_json_dict = {
+            "area": None
+        }
 
-            # Fallback state in case model fails to generate valid structure
-            final_json_dict = {
-                "area": "unclassified"
-            }
+    return final_json_dict["area"]
+
+
+async def _classify_by_retrieval(tier: str, text: str, tools: List) -> Tuple[Optional[str], float]:
+    """Vote with the areas retrieved for the queries of a tier, see `tiered.vote`."""
+    search = next(tool for tool in tools if tool.name == "search_articles")
+    outputs = await asyncio.gather(*(
+        search.ainvoke({"query": query, "n_results": CLASSIFIER_TIER_RESULTS})
+        for query in tier_queries(tier, text)
+    ))
+    return vote([parse_search_results(output) for output in outputs])
+
+
+async def classifier_node(state: AgentState) -> AgentState:
+    """
+    Agent 1: The Classifier.
+    Classifies the input article into one of the existing areas. The tiers of
+    CLASSIFIER_TIERS are tried cheapest first, and the next one only runs when the
+    retrieval vote of the previous one is not confident.
+    """
+    logger.info("=" * 50)
+    logger.info("CLASSIFIER NODE - Starting")
+
+    text = _article_text(state)
+    area = None
+
+    async with _mcp_tools() as tools:
+        for tier in CLASSIFIER_TIERS:
+            metrics.increment(f"classifier.tier.{tier}.attempts")
+            with metrics.timer(f"classifier.tier.{tier}.seconds"):
+                if tier == "agent":
+                    # Only a validated area counts, a failed agent keeps the earlier tiers' area
+                    tier_area = await _classify_with_agent(state, tools)
+                    confidence = 1.0 if tier_area else 0.0
+                else:
+                    try:
+                        tier_area, confidence = await _classify_by_retrieval(tier, text, tools)
+                    except Exception as e:
+                        logger.error(f"Classifier tier '{tier}' failed: {e}")
+                        tier_area, confidence = None, 0.0
+                area = tier_area or area
+
+            if tier_area and confidence >= CLASSIFIER_CONFIDENCE:
+                metrics.increment(f"classifier.tier.{tier}.hits")
+                logger.info(f"Classification settled at tier '{tier}': area='{area}' (confidence {confidence:.2f})")
+                break
+            logger.info(f"Tier '{tier}' not confident (area='{area}', confidence {confidence:.2f}), escalating")
 
     logger.info("CLASSIFIER NODE - Completed")
     logger.info("=" * 50)
-    
-    return {"area": final_json_dict["area"]}
 
-def extractor_node(state: AgentState) -> AgentState:
+    return {"area": area or "unclassified"}
+
+async def _invoke_structured(messages: List[BaseMessage], schema: Type[BaseModel], node: str) -> dict:
+    """
+    Run one structured-output LLM call with the configured STRUCTURED_OUTPUT_MODE.
+    Returns the raw response, to be turned into the schema by `_structured_response`.
+    """
+    if STRUCTURED_OUTPUT_MODE == "native":
+        # Schema-constrained decoding: a single call, no schema retry loop
+        structured_llm = _with_retries(llm.with_structured_output(schema, method="json_schema", include_raw=True))
+        response = await structured_llm.ainvoke(messages)
+        prefix_cache.record_usage([response["raw"]], node)
+    else:
+        agent = create_agent(
+            model=llm,
+            response_format=ToolStrategy(schema),
+            middleware=[model_retry],
+        )
+
+        response = await agent.ainvoke({"messages": messages})
+        prefix_cache.record_usage(response["messages"], node)
+
+    return response
+
+
+def _structured_response(response: dict, schema: Type[BaseModel], node: str) -> BaseModel:
+    """Extract the validated schema instance from a `_invoke_structured` response."""
+    if STRUCTURED_OUTPUT_MODE == "native":
+        structured_response = response["parsed"]
+        if structured_response is None:
+            # Near-miss JSON is repaired locally instead of asking the model again
+            logger.warning(f"Structured output did not validate, repairing locally: {response['parsing_error']}")
+            metrics.increment(f"structured_output.{node}.repairs")
+            structured_response = parse_structured(response["raw"].text, schema)
+    else:
+        metrics.increment(f"structured_output.{node}.retries", count_schema_retries(response["messages"], schema))
+        structured_response = response["structured_response"]
+
+    return structured_response
+
+
+def _extraction_fallback(e: Exception) -> dict:
+    """Fallback extraction in case model fails to generate valid structure."""
+    return {
+        "what problem does the artcle propose to solve?": "Error during extraction",
+        "step by step on how to solve it": ["Error"],
+        "conclusion": f"Could not extract due to error: {e}"
+    }
+
+
+async def extractor_node(state: AgentState) -> AgentState:
     """
     Agent 2: The Extractor.
     Analyzes the text and forces output into the strict Pydantic schema.
@@ -87,41 +350,70 @@ def extractor_node(state: AgentState) -> AgentState:
     logger.info("EXTRACTOR NODE - Starting")
     logger.info(f"Current area: {state.get('area', 'N/A')}")
 
-    input_message = {"messages": [{"role": "user", "content": state["input_text"]}]}
+    messages = prefix_cache.messages(_article_text(state), EXTRACTION_PROMPT)
 
-    agent = create_agent(
-        model=llm,
-        system_prompt=EXTRACTION_PROMPT,
-        response_format=ToolStrategy(ExtractionResponse),
-    )
-
-    response = agent.invoke(input_message)
+    response = await _invoke_structured(messages, ExtractionResponse, "extractor")
     logger.info("Extractor agent response received")
     
     try:    
+        structured_response = _structured_response(response, ExtractionResponse, "extractor")
+
         # Convert the Pydantic object to a standard Python dictionary.
         # IMPORTANT: by_alias=True ensures the keys have the typo required by the prompt.
-        final_json_dict = response["structured_response"].model_dump(by_alias=True)
+        final_json_dict = structured_response.model_dump(by_alias=True)
 
         logger.info("Extraction successful")
         logger.info(f"Extracted fields: {list(final_json_dict.keys())}")
         
     except Exception as e:
         logger.error(f"Extraction failed: {str(e)}")
+        metrics.increment("structured_output.extractor.failures")
 
-        # Fallback state in case model fails to generate valid structure
-        final_json_dict = {
-            "what problem does the artcle propose to solve?": "Error during extraction",
-            "step by step on how to solve it": ["Error"],
-            "conclusion": f"Could not extract due to error: {e}"
-        }
+        final_json_dict = _extraction_fallback(e)
     
     logger.info("EXTRACTOR NODE - Completed")
     logger.info("=" * 50)
 
     return {"extraction": final_json_dict}
 
-def reviewer_node(state: AgentState) -> AgentState:
+async def extract_review_node(state: AgentState) -> AgentState:
+    """
+    Agents 2+3 combined: The Extractor-Reviewer.
+    Produces the extraction and the Portuguese review in a single LLM call, for
+    high-volume runs where a second call over the same article costs more than it adds.
+    """
+    logger.info("=" * 50)
+    logger.info("EXTRACT+REVIEW NODE - Starting")
+    logger.info(f"Current area: {state.get('area', 'N/A')}")
+
+    messages = prefix_cache.messages(_article_text(state), EXTRACTION_REVIEW_PROMPT)
+
+    response = await _invoke_structured(messages, ExtractionReviewResponse, "extract_review")
+    logger.info("Extractor-reviewer agent response received")
+
+    try:
+        structured_response = _structured_response(response, ExtractionReviewResponse, "extract_review")
+
+        # Split the combined schema into the artifacts produced by the separate nodes
+        final_json_dict = structured_response.model_dump(by_alias=True, exclude={"review_markdown"})
+        review_content = structured_response.review_markdown
+
+        logger.info("Extraction and review successful")
+        logger.info(f"Review length: {len(review_content)} characters")
+
+    except Exception as e:
+        logger.error(f"Extraction and review failed: {str(e)}")
+        metrics.increment("structured_output.extract_review.failures")
+
+        final_json_dict = _extraction_fallback(e)
+        review_content = f"Erro ao gerar resenha: {str(e)}"
+
+    logger.info("EXTRACT+REVIEW NODE - Completed")
+    logger.info("=" * 50)
+
+    return {"extraction": final_json_dict, "review_markdown": review_content}
+
+async def reviewer_node(state: AgentState) -> AgentState:
     """
     Agent 3: The Reviewer.
     Analyzes the text and produces a critical review in Portuguese.
@@ -131,14 +423,15 @@ def reviewer_node(state: AgentState) -> AgentState:
     logger.info(f"Current area: {state.get('area', 'N/A')}")
     logger.info(f"Extraction completed: {state.get('extraction') is not None}")
 
-    input_message = {"messages": [{"role": "user", "content": state["input_text"]}]}
+    input_message = {"messages": prefix_cache.messages(_article_text(state), REVIEWER_PROMPT)}
 
     agent = create_agent(
         model=llm,
-        system_prompt=REVIEWER_PROMPT,
+        middleware=[model_retry],
     )
 
-    response = agent.invoke(input_message)
+    response = await agent.ainvoke(input_message)
+    prefix_cache.record_usage(response["messages"], "reviewer")
     logger.info("Reviewer agent response received")
 
     try:
@@ -160,11 +453,11 @@ def reviewer_node(state: AgentState) -> AgentState:
 
 
 if __name__ == "__main__":
-    # import asyncio
+    import asyncio
     # asyncio.run(classifier_node())
 
-    # extractor_node()
+    # asyncio.run(extractor_node())
 
-    reviewer_node()
+    asyncio.run(reviewer_node())
 
 
@@ -0,0 +1,373 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from research_mcp_agent.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Job queue shared by the coordinator and the worker processes
+JOB_DB = Path(__file__).parent.parent / "jobs.sqlite"
+
+# A running job whose worker has not reported for this long is handed out again
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "1800"))
+
+# Seconds between two polls of the queue by idle workers and by the coordinator
+POLL_INTERVAL = 1.0
+
+# A worker slot is restarted at most this many times; the n-th restart waits
+# RESTART_BACKOFF_SECONDS * 2^(n-1) seconds, up to MAX_RESTART_BACKOFF_SECONDS
+MAX_WORKER_RESTARTS = int(os.getenv("POOL_MAX_WORKER_RESTARTS", "5"))
+RESTART_BACKOFF_SECONDS = float(os.getenv("POOL_RESTART_BACKOFF_SECONDS", "2"))
+MAX_RESTART_BACKOFF_SECONDS = 60.0
+
+
+class JobQueue:
+    def __init__(self, path: Path = JOB_DB, max_attempts: int = 3, lease_seconds: float = LEASE_SECONDS) -> None:
+        """
+        Durable job queue in a local SQLite database.
+
+        Every process opens its own connection; claims run in `BEGIN IMMEDIATE`
+        transactions, so two workers never get the same job. A job is 'pending',
+        'running', 'done' (its output is stored with it) or 'failed' once it has
+        used up its attempts. Running jobs carry a lease: when a worker dies, its
+        job is handed to another worker after the lease expires, or right away
+        when the coordinator notices the crash.
+
+        Args:
+            path (Path): The SQLite database file.
+            max_attempts (int): Attempts per job before it is marked 'failed'.
+            lease_seconds (float): How long a claimed job stays with its worker.
+        """
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                combined INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_until REAL,
+                error TEXT,
+                result TEXT,
+                seconds REAL,
+                updated_at REAL,
+                UNIQUE (file_path, combined)
+            )"""
+        )
+
+    def enqueue(self, file_paths: List[str], combined: bool = False) -> List[int]:
+        """
+        Add jobs, skipping the files already queued in the same mode. Jobs that
+        failed in a previous run get a fresh set of attempts.
+
+        Returns:
+            List[int]: The job IDs of file_paths, in order.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO jobs (file_path, combined, updated_at) VALUES (?, ?, ?)
+                   ON CONFLICT (file_path, combined) DO UPDATE
+                   SET status = 'pending', attempts = 0, error = NULL, updated_at = excluded.updated_at
+                   WHERE status = 'failed'""",
+                [(str(file_path), int(combined), now) for file_path in file_paths],
+            )
+
+        rows = self.conn.execute("SELECT file_path, id FROM jobs WHERE combined = ?", (int(combined),))
+        job_ids = dict(rows.fetchall())
+        return [job_ids[str(file_path)] for file_path in file_paths]
+
+    def claim(self, worker: str, job_ids: List[int]) -> Optional[Tuple[int, str, bool]]:
+        """
+        Take the oldest pending job, or a running job whose lease expired, among job_ids
+        (the jobs of the worker's run; other runs may share the queue).
+
+        Returns:
+            Optional[Tuple[int, str, bool]]: (job ID, file path, combined), None
+                when there is nothing to do right now.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                """SELECT id, file_path, combined FROM jobs
+                   WHERE (status = 'pending' OR (status = 'running' AND lease_until < ?))
+                   AND id IN (SELECT value FROM json_each(?))
+                   ORDER BY id LIMIT 1""",
+                (now, json.dumps(job_ids)),
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    """UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?,
+                       lease_until = ?, updated_at = ? WHERE id = ?""",
+                    (worker, now + self.lease_seconds, now, row[0]),
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return (row[0], row[1], bool(row[2])) if row is not None else None
+
+    def complete(self, job_id: int, result: dict, seconds: float) -> None:
+        """Store the output of a job and mark it done."""
+        with self.conn:
+            self.conn.execute(
+                """UPDATE jobs SET status = 'done', result = ?, seconds = ?, error = NULL,
+                   lease_until = NULL, updated_at = ? WHERE id = ?""",
+                (json.dumps(result, ensure_ascii=False), seconds, time.time(), job_id),
+            )
+
+    def fail(self, job_id: int, error: str) -> None:
+        """Record a failed attempt: the job goes back to the queue until it runs out of attempts."""
+        with self.conn:
+            self.conn.execute(
+                """UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                   error = ?, lease_until = NULL, updated_at = ? WHERE id = ?""",
+                (self.max_attempts, error, time.time(), job_id),
+            )
+
+    def release(self, job_ids: List[int], worker: Optional[str] = None) -> int:
+        """
+        Return the running jobs among job_ids of a crashed worker (or of every worker,
+        after an interrupted run) to the queue. The interruption counts as an attempt.
+
+        Returns:
+            int: Number of jobs released.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                """UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                   error = 'worker crashed', lease_until = NULL, updated_at = ?
+                   WHERE status = 'running' AND (? IS NULL OR worker = ?)
+                   AND id IN (SELECT value FROM json_each(?))""",
+                (self.max_attempts, time.time(), worker, worker, json.dumps(job_ids)),
+            )
+        return cursor.rowcount
+
+    def abandon(self, job_ids: List[int], error: str) -> int:
+        """
+        Mark the unfinished jobs among job_ids as failed, when no worker is left to run them.
+
+        Returns:
+            int: Number of jobs marked as failed.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                """UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated_at = ?
+                   WHERE status IN ('pending', 'running') AND id IN (SELECT value FROM json_each(?))""",
+                (error, time.time(), json.dumps(job_ids)),
+            )
+        return cursor.rowcount
+
+    def counts(self, job_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """Number of jobs per status, over job_ids or the whole queue."""
+        counts = {"pending": 0, "running": 0, "done": 0, "failed": 0}
+        for _, status in self._select("id, status", job_ids):
+            counts[status] += 1
+        return counts
+
+    def finished(self, job_ids: Optional[List[int]] = None,
+                 skip: Set[int] = frozenset()) -> List[Tuple[int, str, str, Optional[dict], float]]:
+        """
+        The finished jobs, as (job ID, file path, status, output, seconds); the
+        output is None for failed jobs. Jobs in skip (already reported) are left out.
+        """
+        rows = self._select("id, file_path, status, result, seconds", job_ids, "status IN ('done', 'failed')")
+        return [
+            (job_id, file_path, status, json.loads(result) if result else None, seconds or 0.0)
+            for job_id, file_path, status, result, seconds in rows if job_id not in skip
+        ]
+
+    def _select(self, columns: str, job_ids: Optional[List[int]], condition: str = "1") -> List[tuple]:
+        rows = self.conn.execute(f"SELECT {columns} FROM jobs WHERE {condition} ORDER BY id").fetchall()
+        if job_ids is None:
+            return rows
+        selected = set(job_ids)
+        return [row for row in rows if row[0] in selected]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+async def _worker_loop(queue: JobQueue, job_ids: List[int], worker: str, n_workers: int, dedup: bool) -> None:
+    """Process the jobs of the run until they are all finished, with one warm graph and MCP session."""
+    from research_mcp_agent.agent.graph import agent_workflow, open_checkpointer
+    from research_mcp_agent.agent.nodes import rate_limiter, warm_mcp_session
+    from research_mcp_agent.io import read_file_content
+
+    # Every worker has its own limiter: together they stay within the configured quota
+    rate_limiter.share(n_workers)
+
+    async with open_checkpointer() as checkpointer, warm_mcp_session():
+        while True:
+            job = queue.claim(worker, job_ids)
+            if job is None:
+                counts = queue.counts(job_ids)
+                if counts["pending"] == 0 and counts["running"] == 0:
+                    break
+                # Another worker may still fail a job back into the queue
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+
+            job_id, file_path, combined = job
+            logger.info(f"{worker} processing {file_path}")
+            start = time.perf_counter()
+            try:
+                input_text = read_file_content(file_path)
+                output = await agent_workflow(input_text, combined=combined, checkpointer=checkpointer,
+                                              dedup=dedup)
+                queue.complete(job_id, output, time.perf_counter() - start)
+            except Exception as e:
+                logger.error(f"{worker} failed to process {file_path}: {e}")
+                queue.fail(job_id, str(e))
+
+
+def _worker_main(queue_path: Path, max_attempts: int, job_ids: List[int], worker: str, n_workers: int,
+                 dedup: bool) -> None:
+    """Entry point of a worker process."""
+    logging.basicConfig(level=logging.INFO,
+                        format=f'%(asctime)s - {worker} - %(name)s - %(levelname)s - %(message)s')
+    queue = JobQueue(queue_path, max_attempts=max_attempts)
+    try:
+        asyncio.run(_worker_loop(queue, job_ids, worker, n_workers, dedup))
+    finally:
+        queue.close()
+        metrics.log()
+
+
+def run_pool(file_paths: List[str], workers: Optional[int] = None, combined: bool = False,
+             on_result: Optional[Callable[[str, dict], None]] = None, dedup: bool = True,
+             queue_path: Path = JOB_DB, max_attempts: int = 3) -> Dict[str, int]:
+    """
+    Process articles with a pool of worker processes pulling from a SQLite job queue.
+
+    Each worker is a separate interpreter holding a compiled graph, a checkpointer
+    and one warm MCP session, so PDF parsing and JSON validation of several
+    articles run on several cores while the LLM calls overlap. This process is the
+    coordinator: it queues the jobs, reports progress, returns the jobs of crashed
+    workers to the queue, replaces those workers, and hands every output to
+    on_result (so results are written by a single process).
+
+    A crashed worker is replaced after an exponential backoff, and a worker slot
+    that crashes more than MAX_WORKER_RESTARTS times is not replaced. When no
+    worker is left, the unfinished articles are reported as failed instead of
+    waiting for workers that keep crashing (e.g. on startup).
+
+    The queue persists between runs: rerunning the same batch only processes the
+    articles that are not done, and retries the failed ones.
+
+    Args:
+        file_paths (List[str]): Input files (.pdf, .url or text).
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        combined (bool): Produce the extraction and the review in a single LLM call.
+        on_result (Callable[[str, dict], None], optional): Called with the file path
+            and the output of every successful article.
+        dedup (bool): Reuse the output of near-duplicate inputs.
+        queue_path (Path): The SQLite job queue.
+        max_attempts (int): Attempts per article before it is reported as failed.
+
+    Returns:
+        Dict[str, int]: Number of 'processed' and 'failed' articles.
+    """
+    queue = JobQueue(queue_path, max_attempts=max_attempts)
+    job_ids = queue.enqueue(file_paths, combined=combined)
+    # Jobs left running by an interrupted run go back to the queue
+    queue.release(job_ids)
+    counts = queue.counts(job_ids)
+    n_workers = min(workers or os.cpu_count() or 1, counts["pending"])
+    logger.info(f"Queued {len(job_ids)} articles for {n_workers} workers: {counts}")
+
+    # Spawn, not fork: the parent may hold gRPC/asyncio state that must not be copied
+    context = multiprocessing.get_context("spawn")
+
+    def start_worker(name: str) -> multiprocessing.Process:
+        process = context.Process(target=_worker_main, name=name,
+                                  args=(queue_path, max_attempts, job_ids, name, n_workers, dedup))
+        process.start()
+        return process
+
+    processes = {f"worker-{i}": start_worker(f"worker-{i}") for i in range(n_workers)}
+    crashes = {name: 0 for name in processes}
+    # Crashed worker slots waiting for their backoff, with the time to restart them
+    restarts: Dict[str, float] = {}
+    reported = set()
+    summary = {"processed": 0, "failed": 0}
+    last_counts = None
+
+    def report_finished() -> None:
+        for job_id, file_path, status, output, seconds in queue.finished(job_ids, skip=reported):
+            reported.add(job_id)
+
+            if status == "done":
+                metrics.observe("pool.job_seconds", seconds)
+                if on_result is not None:
+                    on_result(file_path, output)
+                summary["processed"] += 1
+            else:
+                logger.error(f"Failed to process {file_path} after {max_attempts} attempts")
+                summary["failed"] += 1
+
+    try:
+        while processes or restarts:
+            for name, process in list(processes.items()):
+                process.join(timeout=POLL_INTERVAL / len(processes))
+                if process.is_alive():
+                    continue
+
+                del processes[name]
+                if process.exitcode != 0:
+                    released = queue.release(job_ids, name)
+                    crashes[name] += 1
+                    logger.warning(f"{name} exited with code {process.exitcode}, {released} job(s) requeued")
+                    metrics.increment("pool.worker_crashes")
+                    if crashes[name] > MAX_WORKER_RESTARTS:
+                        logger.error(f"{name} crashed {crashes[name]} times, not restarting it")
+                    elif queue.counts(job_ids)["pending"]:
+                        delay = min(RESTART_BACKOFF_SECONDS * 2 ** (crashes[name] - 1), MAX_RESTART_BACKOFF_SECONDS)
+                        logger.info(f"Restarting {name} in {delay:.0f}s")
+                        restarts[name] = time.monotonic() + delay
+
+            for name, restart_at in list(restarts.items()):
+                if time.monotonic() < restart_at:
+                    continue
+                del restarts[name]
+                if queue.counts(job_ids)["pending"]:
+                    processes[name] = start_worker(name)
+                    metrics.increment("pool.worker_restarts")
+
+            if not processes and restarts:
+                # Nothing to join while every slot waits for its backoff
+                time.sleep(POLL_INTERVAL)
+
+            report_finished()
+            counts = queue.counts(job_ids)
+            if counts != last_counts:
+                logger.info(f"Progress: {counts}")
+                last_counts = counts
+
+        abandoned = queue.abandon(job_ids, "no worker stayed up")
+        if abandoned:
+            logger.error(f"Every worker crashed, {abandoned} article(s) marked as failed")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        report_finished()
+        queue.close()
+
+    logger.info(f"Batch completed: {summary}")
+    metrics.log()
+    return summary
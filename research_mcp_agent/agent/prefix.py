@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from research_mcp_agent.agent.prompts import SHARED_SYSTEM_PROMPT
+from research_mcp_agent.metrics import metrics
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """Stable SHA-256 hex digest of a text, used as cache key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PromptPrefixCache:
+    def __init__(self, system_prompt: str = SHARED_SYSTEM_PROMPT, max_entries: int = 32) -> None:
+        """
+        Builds one shared message prefix per article for every LLM node.
+
+        The prefix is `[system prompt, article]` and is identical, token for token,
+        across the classifier, extractor and reviewer; each node only appends its own
+        instructions afterwards. Providers with prefix (context) caching, such as
+        Gemini's implicit caching, then bill and process the article once and serve
+        the following calls from cache.
+
+        The cache also tracks how many input tokens the provider reported as served
+        from its cache, using the `usage_metadata` of the returned messages, so it
+        works with any chat model, including stub models in tests.
+
+        Args:
+            system_prompt (str): System prompt shared by every node.
+            max_entries (int): Number of article prefixes kept in memory (LRU).
+        """
+        self.system_prompt = system_prompt
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._prefixes: "OrderedDict[str, List[BaseMessage]]" = OrderedDict()
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def prefix(self, article: str) -> List[BaseMessage]:
+        """
+        Return the shared prefix for an article, building it on first use.
+
+        Args:
+            article (str): The article text.
+
+        Returns:
+            List[BaseMessage]: The system message followed by the article message.
+        """
+        key = text_hash(article)
+        with self._lock:
+            if key in self._prefixes:
+                self._prefixes.move_to_end(key)
+                metrics.increment("prompt_cache.prefix_hits")
+                return self._prefixes[key]
+
+            prefix = [
+                SystemMessage(content=self.system_prompt),
+                HumanMessage(content=f"<article>\n{article}\n</article>"),
+            ]
+            self._prefixes[key] = prefix
+            if len(self._prefixes) > self.max_entries:
+                self._prefixes.popitem(last=False)
+            metrics.increment("prompt_cache.prefix_misses")
+
+        return prefix
+
+    def messages(self, article: str, instructions: str) -> List[BaseMessage]:
+        """
+        Build the full input of one node: the shared prefix, then its instructions.
+
+        Args:
+            article (str): The article text.
+            instructions (str): The node-specific task instructions.
+
+        Returns:
+            List[BaseMessage]: The messages to send to the model.
+        """
+        return [*self.prefix(article), HumanMessage(content=instructions)]
+
+    def record_usage(self, messages: List[BaseMessage], node: str) -> None:
+        """
+        Accumulate the input and cached token counts reported by the provider.
+
+        Args:
+            messages (List[BaseMessage]): Messages returned by the model or agent;
+                only AI messages carrying `usage_metadata` are counted.
+            node (str): Node name used to label the metrics.
+        """
+        for message in messages:
+            usage = getattr(message, "usage_metadata", None) if isinstance(message, AIMessage) else None
+            if not usage:
+                continue
+
+            input_tokens = usage.get("input_tokens", 0)
+            cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+            with self._lock:
+                self.input_tokens += input_tokens
+                self.cached_tokens += cached_tokens
+
+            metrics.increment(f"prompt_cache.{node}.input_tokens", input_tokens)
+            metrics.increment(f"prompt_cache.{node}.cached_tokens", cached_tokens)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: Total input tokens, cached input tokens and their ratio.
+        """
+        with self._lock:
+            ratio = self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+            return {"input_tokens": self.input_tokens, "cached_tokens": self.cached_tokens, "cached_ratio": ratio}
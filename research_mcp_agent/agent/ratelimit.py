@@ -0,0 +1,234 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from research_mcp_agent.metrics import metrics
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an exception raised by a model call is a provider throttling error (HTTP 429)."""
+    for attribute in ("status_code", "code", "status"):
+        if getattr(error, attribute, None) in (429, "429", "RESOURCE_EXHAUSTED"):
+            return True
+
+    message = str(error).lower()
+    return any(marker in message for marker in ("429", "resource_exhausted", "rate limit", "quota"))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None) -> None:
+        """
+        Token bucket refilled continuously at rate_per_minute.
+
+        Args:
+            rate_per_minute (float): Refill rate; the sustained throughput allowed.
+            capacity (float, optional): Maximum burst size. Defaults to one minute of tokens.
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds to wait before amount tokens are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """Take amount tokens. The balance may go negative to account for underestimates."""
+        self._refill()
+        self.tokens -= amount
+
+
+class AIMDConcurrencyController:
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 decrease_factor: float = 0.5, latency_target: float = 60.0) -> None:
+        """
+        Additive-increase / multiplicative-decrease limit on in-flight model calls.
+
+        Every successful call grows the limit by 1/limit (about +1 per round of calls);
+        a throttling error multiplies it by decrease_factor, and a call slower than
+        latency_target shrinks it gently, so the concurrency converges to what the
+        provider sustains.
+
+        Args:
+            initial_limit (int): Starting concurrency limit.
+            min_limit (int): Lower bound of the limit.
+            max_limit (int): Upper bound of the limit.
+            decrease_factor (float): Multiplier applied on throttling errors.
+            latency_target (float): Latency (seconds) above which the limit decreases.
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.in_flight = 0
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < max(self.min_limit, int(self.limit))
+
+    def on_result(self, latency: float, throttled: bool) -> None:
+        """Adapt the limit to the outcome of one call."""
+        if throttled:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            logger.warning(f"Provider throttling, concurrency limit reduced to {int(self.limit)}")
+        elif latency > self.latency_target:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+        metrics.observe("ratelimit.concurrency_limit", self.limit)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 1_000_000,
+                 controller: Optional[AIMDConcurrencyController] = None) -> None:
+        """
+        Client-side throttling shared by every LLM call of the process.
+
+        A call is admitted once the request bucket, the token bucket and the adaptive
+        concurrency controller all allow it. The time spent waiting is reported as the
+        `ratelimit.queue_wait_seconds` metric.
+
+        Args:
+            requests_per_minute (float): Requests per minute allowed by the provider.
+            tokens_per_minute (float): Tokens (input + output) per minute allowed.
+            controller (AIMDConcurrencyController, optional): Concurrency controller.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.controller = controller or AIMDConcurrencyController()
+
+        # asyncio primitives are bound to one event loop, run_graph creates a new one per call
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def share(self, parts: int) -> None:
+        """
+        Keep 1/parts of the request and token budgets, when parts processes (e.g. the
+        workers of a pool) each run their own limiter against the same provider quota.
+        """
+        self.requests = TokenBucket(self.requests.rate * 60 / parts)
+        self.tokens = TokenBucket(self.tokens.rate * 60 / parts)
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+        return self._condition
+
+    async def acquire(self, estimated_tokens: float) -> float:
+        """
+        Wait until a call of estimated_tokens may start.
+
+        Returns:
+            float: The time spent waiting, in seconds.
+        """
+        start = time.monotonic()
+        condition = self._get_condition()
+
+        async with condition:
+            while True:
+                await condition.wait_for(self.controller.has_capacity)
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                if delay == 0:
+                    break
+                # Sleep outside the lock so releases are not blocked meanwhile
+                condition.release()
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    await condition.acquire()
+
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            self.controller.in_flight += 1
+
+        waited = time.monotonic() - start
+        metrics.observe("ratelimit.queue_wait_seconds", waited)
+        return waited
+
+    async def release(self, latency: float, throttled: bool = False, extra_tokens: float = 0) -> None:
+        """
+        Report the end of a call admitted by `acquire`.
+
+        Args:
+            latency (float): Duration of the call, in seconds.
+            throttled (bool): Whether the provider rejected the call with a rate limit.
+            extra_tokens (float): Tokens used beyond the estimate given to `acquire`.
+        """
+        condition = self._get_condition()
+        async with condition:
+            self.controller.in_flight -= 1
+            self.controller.on_result(latency, throttled)
+            if extra_tokens > 0:
+                self.tokens.consume(extra_tokens)
+            condition.notify_all()
+
+        if throttled:
+            metrics.increment("ratelimit.throttled")
+
+
+def estimate_tokens(messages: List[List[BaseMessage]]) -> int:
+    """Rough token count of the prompt (4 characters per token)."""
+    return sum(len(str(message.content)) for batch in messages for message in batch) // 4
+
+
+class RateLimitCallbackHandler(AsyncCallbackHandler):
+    """
+    Applies a `RateLimiter` to every call of the chat model it is attached to.
+
+    The model waits in `on_chat_model_start` until the limiter admits the call, and
+    the slot is released in `on_llm_end` / `on_llm_error`, so the same handler works
+    for any chat model, including fake models used in tests.
+    """
+
+    # Admission must happen before the call starts, not concurrently with it
+    run_inline = True
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+        self._started: Dict[UUID, tuple] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                                  run_id: UUID, **kwargs: Any) -> None:
+        estimated = estimate_tokens(messages)
+        await self.limiter.acquire(estimated)
+        self._started[run_id] = (time.monotonic(), estimated)
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._started:
+            return
+        start, estimated = self._started.pop(run_id)
+
+        used = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                used += usage.get("total_tokens", 0)
+
+        await self.limiter.release(time.monotonic() - start, extra_tokens=used - estimated)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._started:
+            return
+        start, _ = self._started.pop(run_id)
+
+        await self.limiter.release(time.monotonic() - start, throttled=is_rate_limit_error(error))
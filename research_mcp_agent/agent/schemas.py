@@ -4,7 +4,11 @@ from typing import List, TypedDict, Optional
 class AgentState(TypedDict):
     # Input
     input_text: str          # The raw text of the article to be processed
+    working_text: Optional[str]     # Condensed input_text for papers over the length threshold
     
+    # Run options
+    combined: Optional[bool]        # Extract and review in a single LLM call
+
     # Outputs from Agents
     area: Optional[str]             # "Physics", "Biology", etc.
     extraction: Optional[dict]      # The strict JSON output
@@ -40,3 +44,13 @@ class ExtractionResponse(BaseModel):
         # This allows us to use the clean Python names in code, 
         # but export using the awkward aliases.
         populate_by_name = True
+
+
+class ExtractionReviewResponse(ExtractionResponse):
+    """
+    Pydantic model for the combined extraction + review task: the extraction fields
+    plus the markdown review, produced by a single LLM call.
+    """
+    review_markdown: str = Field(
+        description="The critical review in Portuguese, in Markdown, following the review template."
+    )
@@ -0,0 +1,186 @@
+import difflib
+import json
+import re
+from typing import Any, Dict, List, Type, TypeVar, get_origin
+
+from langchain_core.messages import AIMessage, BaseMessage
+from pydantic import BaseModel, ValidationError
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+# ```json ... ``` fences around the payload
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+# Commas left before a closing bracket, e.g. ["x", "y",]
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+
+# Python literals in value position, e.g. {"done": True}
+PYTHON_LITERAL_PATTERN = re.compile(r"([:\[,]\s*)(True|False|None)\b")
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+class StructuredOutputRepairError(ValueError):
+    """Raised when a model response cannot be turned into the requested schema."""
+
+
+def _close_brackets(text: str) -> str:
+    """Append the closing quotes/brackets of a truncated JSON document."""
+    stack: List[str] = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    return text + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def _remove_trailing_commas(text: str) -> str:
+    return TRAILING_COMMA_PATTERN.sub(r"\1", text)
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse near-miss JSON produced by a model, without calling the model again.
+
+    Repairs, applied in order until the text parses:
+    1. Markdown code fences and prose around the outermost object are stripped.
+    2. Trailing commas and Python literals (True/False/None) are fixed.
+    3. Unterminated strings, objects and arrays (truncated output) are closed, and
+       the trailing comma this can leave (e.g. `["x", "y",]`) is removed.
+
+    Raw control characters inside strings (e.g. unescaped newlines) are accepted
+    at every step.
+
+    Args:
+        text (str): The raw model output.
+
+    Returns:
+        Any: The decoded JSON value.
+
+    Raises:
+        StructuredOutputRepairError: If no repair produces valid JSON.
+    """
+    fenced = FENCE_PATTERN.search(text)
+    candidate = (fenced.group(1) if fenced else text).strip()
+
+    start = candidate.find("{")
+    end = candidate.rfind("}")
+    if start != -1:
+        candidate = candidate[start:end + 1] if end > start else candidate[start:]
+
+    repairs = [
+        lambda s: s,
+        _remove_trailing_commas,
+        lambda s: PYTHON_LITERAL_PATTERN.sub(lambda m: m.group(1) + PYTHON_LITERALS[m.group(2)], s),
+        _close_brackets,
+        _remove_trailing_commas,
+    ]
+
+    for repair in repairs:
+        candidate = repair(candidate)
+        try:
+            return json.loads(candidate, strict=False)
+        except json.JSONDecodeError:
+            continue
+
+    raise StructuredOutputRepairError(f"Could not repair JSON: {text[:200]!r}")
+
+
+def _normalize_key(key: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", key.lower())
+
+
+def _align_keys(data: Dict[str, Any], schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Map the keys of data onto the schema fields, tolerating case, punctuation and
+    small spelling differences (e.g. a model "fixing" the 'artcle' alias typo).
+    """
+    names = {}
+    for name, field in schema.model_fields.items():
+        names[_normalize_key(name)] = name
+        if field.alias:
+            names[_normalize_key(field.alias)] = name
+
+    aligned = {}
+    for key, value in data.items():
+        normalized = _normalize_key(key)
+        match = names.get(normalized)
+        if match is None:
+            close = difflib.get_close_matches(normalized, names, n=1, cutoff=0.8)
+            match = names[close[0]] if close else None
+        if match is not None and match not in aligned:
+            aligned[match] = value
+
+    # A list field answered with a single string: split it into lines
+    for name, field in schema.model_fields.items():
+        value = aligned.get(name)
+        if isinstance(value, str) and get_origin(field.annotation) is list:
+            aligned[name] = [line.strip(" -*\t") for line in value.splitlines() if line.strip(" -*\t")]
+
+    return aligned
+
+
+def parse_structured(text: str, schema: Type[SchemaT]) -> SchemaT:
+    """
+    Validate a raw model response against a schema, repairing it locally if needed.
+
+    Args:
+        text (str): The raw model output.
+        schema (Type[SchemaT]): The Pydantic model to produce.
+
+    Returns:
+        SchemaT: The validated instance.
+
+    Raises:
+        StructuredOutputRepairError: If the response cannot be repaired.
+    """
+    try:
+        data = repair_json(text)
+    except StructuredOutputRepairError:
+        # Single-field schemas (e.g. the classifier's 'area') accept a bare answer
+        fields = list(schema.model_fields)
+        if len(fields) != 1 or not text.strip():
+            raise
+        data = {fields[0]: text.strip().strip("'\"`").strip()}
+
+    if not isinstance(data, dict):
+        raise StructuredOutputRepairError(f"Expected a JSON object, got {type(data).__name__}")
+
+    try:
+        return schema.model_validate(_align_keys(data, schema))
+    except ValidationError as e:
+        raise StructuredOutputRepairError(str(e)) from e
+
+
+def count_schema_retries(messages: List[BaseMessage], schema: Type[BaseModel]) -> int:
+    """
+    Count how many extra model turns a `ToolStrategy` agent spent on the schema.
+
+    Args:
+        messages (List[BaseMessage]): The agent's message history.
+        schema (Type[BaseModel]): The structured output schema.
+
+    Returns:
+        int: Number of structured-output tool calls beyond the first one.
+    """
+    calls = sum(
+        1
+        for message in messages if isinstance(message, AIMessage)
+        for call in message.tool_calls if call["name"] == schema.__name__
+    )
+    return max(calls - 1, 0)
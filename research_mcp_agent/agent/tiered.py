@@ -0,0 +1,136 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Characters of the paper used when no abstract is detected ("first N tokens")
+ABSTRACT_FALLBACK_CHARS = 2000
+# Upper bound of the title + abstract query
+ABSTRACT_MAX_CHARS = 3000
+
+# The 'sections' tier samples this many passages spread over the paper
+SECTION_PASSAGES = 4
+SECTION_PASSAGE_CHARS = 1500
+
+# Heading that ends the abstract
+_ABSTRACT_END = re.compile(
+    r"\b(?:keywords|key words|index terms|(?:1\.?|I\.)?\s*introduction)\b", re.IGNORECASE
+)
+_ABSTRACT_START = re.compile(r"\babstract\b", re.IGNORECASE)
+
+
+def title_and_abstract(text: str) -> str:
+    """
+    Detect the title and abstract of a paper.
+
+    Everything before the 'Abstract' heading (title, authors, affiliations) is kept,
+    and the abstract runs until the keywords or the introduction. Falls back to the
+    first ABSTRACT_FALLBACK_CHARS characters when no abstract heading is found.
+
+    Args:
+        text (str): The paper text.
+
+    Returns:
+        str: The title and abstract, at most ABSTRACT_MAX_CHARS characters.
+    """
+    start = _ABSTRACT_START.search(text[:ABSTRACT_MAX_CHARS])
+    if start is None:
+        return text[:ABSTRACT_FALLBACK_CHARS]
+
+    end = _ABSTRACT_END.search(text, start.end(), start.end() + ABSTRACT_MAX_CHARS)
+    return text[:end.start() if end else start.end() + ABSTRACT_MAX_CHARS][:ABSTRACT_MAX_CHARS]
+
+
+def section_passages(text: str, n_passages: int = SECTION_PASSAGES,
+                     passage_chars: int = SECTION_PASSAGE_CHARS) -> List[str]:
+    """
+    Sample passages spread evenly over the paper (introduction, method, results,
+    conclusion of a typical layout), each searched as its own query: the embedder
+    only reads the start of long queries.
+
+    Args:
+        text (str): The paper text.
+        n_passages (int): Number of passages.
+        passage_chars (int): Length of each passage.
+
+    Returns:
+        List[str]: The passages, in reading order.
+    """
+    if len(text) <= n_passages * passage_chars:
+        return [text[i:i + passage_chars] for i in range(0, len(text), passage_chars)] or [text]
+
+    step = (len(text) - passage_chars) / (n_passages - 1) if n_passages > 1 else 0
+    return [text[int(i * step):int(i * step) + passage_chars] for i in range(n_passages)]
+
+
+def tier_queries(tier: str, text: str) -> List[str]:
+    """
+    The search queries of a retrieval tier.
+
+    Args:
+        tier (str): 'abstract' (title and abstract) or 'sections' (passages sampled
+            over the whole paper).
+        text (str): The paper text.
+
+    Returns:
+        List[str]: The queries to search.
+    """
+    if tier == "abstract":
+        return [title_and_abstract(text)]
+    if tier == "sections":
+        return section_passages(text)
+    raise ValueError(f"Unknown classifier tier: {tier}")
+
+
+def parse_search_results(content: Any) -> List[Dict[str, Any]]:
+    """
+    Decode the output of the `search_articles` MCP tool (one JSON text, or a list
+    of text content blocks) into its list of articles.
+    """
+    if isinstance(content, list) and all(isinstance(item, dict) and "area" in item for item in content):
+        return content
+
+    blocks = content if isinstance(content, list) else [content]
+    articles: List[Dict[str, Any]] = []
+    for block in blocks:
+        text = block.get("text", "") if isinstance(block, dict) else str(block)
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            logger.warning(f"Unexpected search_articles output: {text[:200]}")
+            continue
+        articles += parsed if isinstance(parsed, list) else [parsed]
+
+    return articles
+
+
+def vote(result_lists: List[List[Dict[str, Any]]]) -> Tuple[Optional[str], float]:
+    """
+    Classify by the areas of the retrieved articles.
+
+    Every article votes for its area with weight 1 / rank in its result list, so
+    the best match counts most; the votes of all the lists are added up.
+
+    Args:
+        result_lists (List[List[Dict[str, Any]]]): `search_articles` outputs.
+
+    Returns:
+        Tuple[Optional[str], float]: The winning area and its share of the votes
+            (the confidence, 1.0 when every article agrees). (None, 0.0) when
+            nothing was retrieved.
+    """
+    votes: Dict[str, float] = {}
+    for articles in result_lists:
+        for rank, article in enumerate(articles, start=1):
+            area = article.get("area")
+            if area:
+                votes[area] = votes.get(area, 0.0) + 1.0 / rank
+
+    if not votes:
+        return None, 0.0
+
+    area = max(votes, key=votes.get)
+    return area, votes[area] / sum(votes.values())
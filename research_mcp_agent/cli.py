@@ -1,10 +1,16 @@
 import argparse
 import json
 import logging
+import sys
 
-from research_mcp_agent.agent.graph import run_graph
+from research_mcp_agent.agent.graph import run_batch_graph, run_graph, run_stream_graph
+from research_mcp_agent.agent.pool import run_pool
+from research_mcp_agent.evaluation import run_evaluation
+from research_mcp_agent.ingestion.benchmark import run_benchmark
 from research_mcp_agent.ingestion.indexer import run_create
-from research_mcp_agent.io import read_file_content, save_outputs
+from research_mcp_agent.io import list_input_files, read_file_content, save_outputs
+from research_mcp_agent.io import save_extraction, save_full, save_review
+from research_mcp_agent.results import JsonlResultSink, export_results
 
 
 # Configure logging
@@ -15,7 +21,28 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def run_app(file_path: str = "samples/input_article_1.txt") -> None:
+def _stream_app(file_path: str, input_text: str, combined: bool, dedup: bool) -> None:
+    """Print results as they arrive and write each artifact as soon as its node completes."""
+    def on_event(event: str, value) -> None:
+        if event == "area":
+            print(f"Area: {value}", flush=True)
+        elif event == "review_token":
+            sys.stdout.write(value)
+            sys.stdout.flush()
+        elif event == "extraction":
+            print(json.dumps(value, indent=4), flush=True)
+            logger.info(f"Extraction saved to {save_extraction(file_path, value)}")
+        elif event == "review_markdown":
+            print(flush=True)
+            logger.info(f"Review saved to {save_review(file_path, value)}")
+        elif event == "result":
+            logger.info(f"Full output saved to {save_full(file_path, value)}")
+
+    run_stream_graph(input_text, on_event, combined=combined, dedup=dedup)
+
+
+def run_app(file_path: str = "samples/input_article_1.txt", combined: bool = False, stream: bool = False,
+            no_dedup: bool = False) -> None:
     """
     Main entry point for the Multi-Agent System workflow.
     Orchestrates the complete pipeline: reading input content, executing the multi-agent
@@ -23,6 +50,10 @@ def run_app(file_path: str = "samples/input_article_1.txt") -> None:
     Args:
         file_path (str): Path to the input text file to be processed. 
                         Defaults to "samples/input_article_1.txt".
+        combined (bool): Produce the extraction and the review in a single LLM call.
+        stream (bool): Print the area and the review tokens as they arrive and save
+                        each artifact as soon as its node completes.
+        no_dedup (bool): Run the graph even if a near-duplicate input was already processed.
     Raises:
         Exception: Logs critical errors and exits with status code 1 if any step fails.
     Returns:
@@ -34,7 +65,11 @@ def run_app(file_path: str = "samples/input_article_1.txt") -> None:
         
         # Run the Multi-Agent System
         logger.info("Starting Multi-Agent Workflow...")
-        result = run_graph(input_text)
+        if stream:
+            _stream_app(file_path, input_text, combined, dedup=not no_dedup)
+            return
+
+        result = run_graph(input_text, combined=combined, dedup=not no_dedup)
 
         # Output the result
         print(json.dumps(result, indent=4))
@@ -48,6 +83,45 @@ def run_app(file_path: str = "samples/input_article_1.txt") -> None:
 
 
 
+def run_batch(input_dir: str = "samples/", combined: bool = False, sink: str = "files",
+              results_dir: str = "results/", commit_size: int = 50, no_dedup: bool = False,
+              workers: int = 1, max_attempts: int = 3) -> None:
+    """
+    Process every article of a directory with checkpointing.
+    Re-running the same command after an interruption skips the finished articles
+    and resumes the interrupted one from its last completed node.
+    Args:
+        input_dir (str): Directory containing the input files (.pdf, .url, .txt, .md).
+        combined (bool): Produce the extraction and the review in a single LLM call.
+        sink (str): 'files' writes the three artifacts next to every input; 'jsonl'
+                    appends the results to JSONL segments committed atomically.
+        results_dir (str): Directory of the JSONL segments (sink='jsonl').
+        commit_size (int): Number of results per JSONL commit (sink='jsonl').
+        no_dedup (bool): Run the graph even on near-duplicates of processed inputs.
+        workers (int): Number of worker processes; above 1, articles are pulled from
+                       a SQLite job queue by a pool of processes.
+        max_attempts (int): Attempts per article before it is reported as failed (workers > 1).
+    Returns:
+        None
+    """
+    file_paths = list_input_files(input_dir)
+    logger.info(f"Starting batch of {len(file_paths)} articles...")
+
+    def process(on_result) -> dict:
+        if workers > 1:
+            return run_pool(file_paths, workers=workers, combined=combined, on_result=on_result,
+                            dedup=not no_dedup, max_attempts=max_attempts)
+        return run_batch_graph(file_paths, combined=combined, on_result=on_result, dedup=not no_dedup)
+
+    if sink == "jsonl":
+        with JsonlResultSink(results_dir, batch_size=commit_size) as result_sink:
+            summary = process(result_sink.add)
+    else:
+        summary = process(save_outputs)
+    if summary["failed"]:
+        exit(1)
+
+
 def main():
     # Create the top-level parser
     parser = argparse.ArgumentParser(description="Research MCP agent CLI tool.")
@@ -70,9 +144,81 @@ def main():
                             type=str, 
                             default="samples/input_article_1.txt", 
                             help="Path to the input text file to be processed")
+    parser_run.add_argument("--combined",
+                            action='store_true', # False by default, True when present
+                            help="Extract and review in a single LLM call (cheaper for large batches)")
+    parser_run.add_argument("--stream",
+                            action='store_true', # False by default, True when present
+                            help="Print results as each node completes and stream the review tokens")
+    parser_run.add_argument("--no_dedup",
+                            action='store_true', # False by default, True when present
+                            help="Run the graph even if a near-duplicate input was already processed")
    
     parser_run.set_defaults(func=run_app)
     
+    # --------------------------------------
+    # Sub-command: batch
+    # --------------------------------------
+    parser_batch = subparsers.add_parser("batch", help="Run the agent on every article of a directory (resumable)")
+
+    # Arguments specific to 'batch'
+    parser_batch.add_argument("--input_dir",
+                              type=str,
+                              default="samples/",
+                              help="Directory containing the input files to be processed")
+    parser_batch.add_argument("--combined",
+                              action='store_true', # False by default, True when present
+                              help="Extract and review in a single LLM call (cheaper for large batches)")
+
+    parser_batch.add_argument("--sink",
+                              type=str,
+                              choices=["files", "jsonl"],
+                              default="files",
+                              help="Write per-article files or append to atomic JSONL segments")
+    parser_batch.add_argument("--results_dir",
+                              type=str,
+                              default="results/",
+                              help="Directory of the JSONL segments (--sink jsonl)")
+    parser_batch.add_argument("--commit_size",
+                              type=int,
+                              default=50,
+                              help="Number of results per JSONL commit (--sink jsonl)")
+    parser_batch.add_argument("--no_dedup",
+                              action='store_true', # False by default, True when present
+                              help="Run the graph even on near-duplicates of processed inputs")
+    parser_batch.add_argument("--workers",
+                              type=int,
+                              default=1,
+                              help="Number of worker processes pulling articles from a local job queue")
+    parser_batch.add_argument("--max_attempts",
+                              type=int,
+                              default=3,
+                              help="Attempts per article before it is reported as failed (--workers > 1)")
+
+    parser_batch.set_defaults(func=run_batch)
+
+    # --------------------------------------
+    # Sub-command: export
+    # --------------------------------------
+    parser_export = subparsers.add_parser("export", help="Regenerate the per-article files from JSONL results")
+
+    # Arguments specific to 'export'
+    parser_export.add_argument("--results_dir",
+                               type=str,
+                               default="results/",
+                               help="Directory of the JSONL segments")
+    parser_export.add_argument("--output_dir",
+                               type=str,
+                               default=None,
+                               help="Where to write the files (defaults to next to each input file)")
+    parser_export.add_argument("--sources",
+                               type=str,
+                               nargs="+",
+                               default=None,
+                               help="Only export these input files")
+
+    parser_export.set_defaults(func=export_results)
+
     # --------------------------------------
     # Sub-command: create
     # --------------------------------------
@@ -87,8 +233,108 @@ def main():
                                action='store_true', # False by default, True when present
                                help="Whether to reset the vector store database if it exists") 
     
+    parser_create.add_argument("--backend",
+                               type=str,
+                               choices=["chroma", "quantized"],
+                               default="chroma",
+                               help="Vector store backend: ChromaDB or int8 memory-mapped index")
+    parser_create.add_argument("--shard_by",
+                               type=str,
+                               choices=["area", "hash"],
+                               default=None,
+                               help="Split the vector store into one shard per area or per hash bucket")
+    parser_create.add_argument("--n_shards",
+                               type=int,
+                               default=4,
+                               help="Number of shards when sharding by hash")
+    parser_create.add_argument("--dedup_threshold",
+                               type=float,
+                               default=0.9,
+                               help="Similarity above which a PDF is a near-duplicate and is not indexed again")
+    parser_create.add_argument("--workers",
+                               type=int,
+                               default=None,
+                               help="Number of sentence tokenization processes (defaults to the number of CPUs)")
+    parser_create.add_argument("--snapshot",
+                               action='store_true',
+                               help="Publish a read-only snapshot of the store for fast MCP server startup")
+    
     parser_create.set_defaults(func=run_create)
 
+    # --------------------------------------
+    # Sub-command: benchmark
+    # --------------------------------------
+    parser_benchmark = subparsers.add_parser("benchmark", help="Compare the quantized backend against ChromaDB")
+
+    # Arguments specific to 'benchmark'
+    parser_benchmark.add_argument("--n_queries",
+                                  type=int,
+                                  default=50,
+                                  help="Number of sampled queries")
+    parser_benchmark.add_argument("--n_results",
+                                  type=int,
+                                  default=10,
+                                  help="The k used for recall@k")
+
+    parser_benchmark.set_defaults(func=run_benchmark)
+
+    # --------------------------------------
+    # Sub-command: evaluate
+    # --------------------------------------
+    parser_evaluate = subparsers.add_parser("evaluate",
+                                            help="Leave-one-out retrieval accuracy and latency over a labelled corpus")
+
+    # Arguments specific to 'evaluate' (several values sweep every combination)
+    parser_evaluate.add_argument("--input_dir",
+                                 type=str,
+                                 default="data/raw_articles/",
+                                 help="Directory with one sub-directory of PDFs per area (the labels)")
+    parser_evaluate.add_argument("--embedders",
+                                 type=str,
+                                 nargs="+",
+                                 default=["default"],
+                                 help="Embedders to compare: 'default' (ChromaDB's) and/or sentence-transformers "
+                                      "model names, e.g. all-mpnet-base-v2")
+    parser_evaluate.add_argument("--backends",
+                                 type=str,
+                                 nargs="+",
+                                 choices=["chroma", "quantized"],
+                                 default=["chroma"],
+                                 help="Vector store backends to evaluate")
+    parser_evaluate.add_argument("--max_sentences",
+                                 type=int,
+                                 nargs="+",
+                                 default=[8],
+                                 help="Chunk sizes, in sentences")
+    parser_evaluate.add_argument("--overlaps",
+                                 type=int,
+                                 nargs="+",
+                                 default=[1],
+                                 help="Chunk overlaps, in sentences")
+    parser_evaluate.add_argument("--modes",
+                                 type=str,
+                                 nargs="+",
+                                 choices=["dense", "lexical", "hybrid"],
+                                 default=["hybrid"],
+                                 help="Search modes")
+    parser_evaluate.add_argument("--queries",
+                                 type=str,
+                                 nargs="+",
+                                 choices=["abstract", "sections"],
+                                 default=["abstract"],
+                                 help="Search each held-out paper by its title/abstract or by passages of its sections")
+    parser_evaluate.add_argument("--k",
+                                 type=int,
+                                 nargs="+",
+                                 default=[1, 3],
+                                 help="Numbers of retrieved articles for accuracy@k and recall@k")
+    parser_evaluate.add_argument("--output",
+                                 type=str,
+                                 default=None,
+                                 help="Write the report to this JSON file")
+
+    parser_evaluate.set_defaults(func=run_evaluation)
+
     # --- Parse and Dispatch ---
     args = parser.parse_args()
 
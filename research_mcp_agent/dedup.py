@@ -0,0 +1,205 @@
+import os
+import zlib
+import numpy as np
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from research_mcp_agent.ingestion.bm25 import tokenize
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Hash family (a * x + b) mod p, truncated to 32 bits
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    Hash the word n-grams of a text.
+
+    Tokens are normalized with the BM25 tokenizer, so the same paper read from a
+    PDF, an arXiv download or pasted text yields mostly the same shingles despite
+    case, punctuation and line-break differences.
+
+    Args:
+        text (str): The text to shingle.
+        size (int): Number of words per shingle.
+
+    Returns:
+        np.ndarray: The distinct 32-bit shingle hashes (uint64).
+    """
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        tokens = tokens + [""] * (size - len(tokens))
+
+    hashes = {zlib.crc32(" ".join(tokens[i:i + size]).encode("utf-8")) for i in range(len(tokens) - size + 1)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Pick the LSH banding (bands, rows) for a Jaccard threshold.
+
+    Two signatures become candidates when all rows of at least one band agree,
+    which happens with probability 1 - (1 - s^rows)^bands for similarity s. The
+    curve is steepest around (1 / bands)^(1 / rows), which is matched to threshold.
+
+    Args:
+        threshold (float): Jaccard similarity above which inputs are duplicates.
+        num_perm (int): Signature length.
+
+    Returns:
+        Tuple[int, int]: Number of bands and rows per band.
+    """
+    candidates = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(candidates, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class MinHashIndex:
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, seed: int = 1) -> None:
+        """
+        MinHash signatures with an LSH band index for near-duplicate detection.
+
+        Each text is summarized by `num_perm` min-hashes of its shingles; the fraction
+        of equal min-hashes between two signatures estimates the Jaccard similarity of
+        the texts. Signatures are split into bands hashed into buckets, so a lookup
+        only compares the texts sharing a bucket instead of the whole index.
+
+        Args:
+            threshold (float): Estimated Jaccard similarity above which two texts are
+                near-duplicates.
+            num_perm (int): Number of hash permutations (signature length).
+            seed (int): Seed of the permutations; signatures are only comparable
+                between indexes with the same num_perm and seed.
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.seed = seed
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self.keys: List[str] = []
+        self.signatures: List[np.ndarray] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """The signature indexed under key, None if there is none."""
+        position = self._positions.get(key)
+        return self.signatures[position] if position is not None else None
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Args:
+            text (str): The text to summarize.
+
+        Returns:
+            np.ndarray: The MinHash signature, `num_perm` uint32 values.
+        """
+        hashes = shingles(text)
+        # (num_shingles, num_perm) permuted hashes, then the minimum of each permutation
+        permuted = ((hashes[:, None] * self._a + self._b) % MERSENNE_PRIME) & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: str, signature: np.ndarray) -> None:
+        """
+        Index a signature under key.
+
+        Args:
+            key (str): Identifier returned by `query`.
+            signature (np.ndarray): Signature from `signature`.
+        """
+        position = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(signature)
+        self._positions[key] = position
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band[band_key].append(position)
+
+    def remove(self, keys: Iterable[str]) -> int:
+        """
+        Drop the signatures indexed under the given keys (the buckets are rebuilt).
+
+        Returns:
+            int: The number of signatures removed.
+        """
+        drop = set(keys) & self._positions.keys()
+        if not drop:
+            return 0
+
+        kept = [(key, signature) for key, signature in zip(self.keys, self.signatures) if key not in drop]
+        self.keys, self.signatures, self._positions = [], [], {}
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        for key, signature in kept:
+            self.add(key, signature)
+
+        return len(drop)
+
+    def query(self, signature: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Find the indexed texts similar to a signature.
+
+        Args:
+            signature (np.ndarray): Signature from `signature`.
+
+        Returns:
+            List[Tuple[str, float]]: (key, estimated Jaccard similarity) pairs above
+                the threshold, most similar first.
+        """
+        candidates = set()
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(band_key, ()))
+
+        matches = []
+        for position in candidates:
+            similarity = float(np.mean(self.signatures[position] == signature))
+            if similarity >= self.threshold:
+                matches.append((self.keys[position], similarity))
+
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def save(self, path: Path) -> None:
+        """Persist the index as a single .npz file, replaced atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            keys=np.asarray(self.keys, dtype=str),
+            signatures=np.asarray(self.signatures, dtype=np.uint32).reshape(-1, self.num_perm),
+            params=np.asarray([self.threshold, self.num_perm, self.seed], dtype=np.float64),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, threshold: Optional[float] = None) -> "MinHashIndex":
+        """
+        Load an index saved with `save`.
+
+        Args:
+            path (Path): The .npz file.
+            threshold (float, optional): Override the saved threshold (the bands are
+                rebuilt, the signatures stay valid).
+        """
+        with np.load(path) as data:
+            saved_threshold, num_perm, seed = data["params"].tolist()
+            index = cls(threshold=threshold or saved_threshold, num_perm=int(num_perm), seed=int(seed))
+            for key, signature in zip(data["keys"].tolist(), data["signatures"]):
+                index.add(key, signature)
+
+        return index
@@ -0,0 +1,177 @@
+import itertools
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from research_mcp_agent.agent.tiered import tier_queries, vote
+from research_mcp_agent.ingestion.indexer import BaseIndexer, chunk_pdfs, document_id, group_hits_by_article
+from research_mcp_agent.ingestion.indexer import make_indexer
+from research_mcp_agent.ingestion.loader import process_pdfs
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chunks fetched per requested article, as in the MCP server
+OVERFETCH_FACTOR = 5
+
+
+def sweep_configs(embedders: Sequence[str], backends: Sequence[str], max_sentences: Sequence[int],
+                  overlaps: Sequence[int], modes: Sequence[str], queries: Sequence[str]) -> List[Dict[str, Any]]:
+    """Every combination of the swept settings, one configuration dictionary each."""
+    return [
+        {"embedder": embedder, "backend": backend, "max_sentences": size, "overlap": overlap,
+         "mode": mode, "query": query}
+        for embedder, backend, size, overlap, mode, query
+        in itertools.product(embedders, backends, max_sentences, overlaps, modes, queries)
+    ]
+
+
+def make_embedding_function(embedder: str) -> Optional[Any]:
+    """
+    The embedding function named on the command line: 'default' is ChromaDB's
+    default embedder (None), any other name a sentence-transformers model, e.g.
+    'all-mpnet-base-v2' (requires the sentence-transformers package).
+    """
+    if embedder == "default":
+        return None
+
+    from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+    return SentenceTransformerEmbeddingFunction(model_name=embedder)
+
+
+def leave_one_out(indexer: BaseIndexer, raw_docs: List[Dict[str, str]], mode: str, query: str,
+                  k: Sequence[int]) -> Dict[str, float]:
+    """
+    Classify every indexed paper using only the other papers.
+
+    Each paper is turned into queries (see `tiered.tier_queries`) and searched with
+    its own document excluded, so a single index serves every round: the document
+    is filtered out of the results, and its chunks are left out of the BM25
+    statistics, as in an index built without it. The retrieved articles vote for
+    an area as in the classifier's retrieval tiers.
+
+    Args:
+        indexer (BaseIndexer): Index of all the papers.
+        raw_docs (List[Dict[str, str]]): The papers, with their 'area' label.
+        mode (str): Search mode, 'dense', 'lexical' or 'hybrid'.
+        query (str): 'abstract' or 'sections'.
+        k (Sequence[int]): Numbers of retrieved articles to evaluate.
+
+    Returns:
+        Dict[str, float]: For every k, 'accuracy@k' (the vote of the top-k articles
+            gives the right area) and 'recall@k' (fraction of the other papers of the
+            same area among the top-k); 'p50_ms' and 'p95_ms' query latencies.
+    """
+    k_max = max(k)
+    correct: Dict[int, List[bool]] = {n: [] for n in k}
+    recall: Dict[int, List[float]] = {n: [] for n in k}
+    latencies = []
+
+    for doc in raw_docs:
+        held_out = document_id(doc)
+        relevant = {
+            other['filename'] for doc_id, other in indexer.documents.items()
+            if doc_id != held_out and other.get('area') == doc['area']
+        }
+
+        result_lists = []
+        for text in tier_queries(query, doc['text']):
+            start = time.perf_counter()
+            results = indexer.search([text], n_results=k_max * OVERFETCH_FACTOR, mode=mode,
+                                     exclude={held_out})
+            latencies.append((time.perf_counter() - start) * 1000)
+            result_lists.append(group_hits_by_article(results, n_articles=k_max))
+
+        for n in k:
+            top = [articles[:n] for articles in result_lists]
+            area, _ = vote(top)
+            correct[n].append(area == doc['area'])
+            if relevant:
+                found = {article['filename'] for articles in top for article in articles} & relevant
+                recall[n].append(len(found) / len(relevant))
+
+    report = {}
+    for n in k:
+        report[f"accuracy@{n}"] = float(np.mean(correct[n])) if correct[n] else 0.0
+        report[f"recall@{n}"] = float(np.mean(recall[n])) if recall[n] else 0.0
+    report["p50_ms"] = float(np.percentile(latencies, 50)) if latencies else 0.0
+    report["p95_ms"] = float(np.percentile(latencies, 95)) if latencies else 0.0
+
+    return report
+
+
+def run_evaluation(input_dir: str = "data/raw_articles/", embedders: Sequence[str] = ("default",),
+                   backends: Sequence[str] = ("chroma",), max_sentences: Sequence[int] = (8,),
+                   overlaps: Sequence[int] = (1,), modes: Sequence[str] = ("hybrid",),
+                   queries: Sequence[str] = ("abstract",), k: Sequence[int] = (1, 3), output: Optional[str] = None,
+                   workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Offline retrieval evaluation over a labelled corpus, in leave-one-out form.
+
+    The area folders of input_dir are the labels. For every configuration of the
+    sweep (the product of all the listed settings), each paper is classified from
+    the others (see `leave_one_out`), which measures whether an indexing or
+    retrieval change keeps the classification quality while changing the latency.
+    The PDFs are extracted once, and an index is built once per embedder, backend
+    and chunking setting, in a temporary directory, for all its search modes and
+    query types.
+
+    Args:
+        input_dir (str): Directory with one sub-directory of PDFs per area.
+        embedders (Sequence[str]): Embedders to compare, 'default' (ChromaDB's
+            default embedder) and/or sentence-transformers model names.
+        backends (Sequence[str]): Backends to evaluate, 'chroma' and/or 'quantized'.
+        max_sentences (Sequence[int]): Chunk sizes (sentences per chunk).
+        overlaps (Sequence[int]): Chunk overlaps (sentences).
+        modes (Sequence[str]): Search modes, 'dense', 'lexical' and/or 'hybrid'.
+        queries (Sequence[str]): What each held-out paper is searched with: 'abstract'
+            (title and abstract) and/or 'sections' (passages over the whole paper).
+        k (Sequence[int]): Numbers of retrieved articles for accuracy@k and recall@k.
+        output (str, optional): Write the report to this JSON file.
+        workers (int, optional): Sentence tokenization processes. Defaults to the number of CPUs.
+
+    Returns:
+        List[Dict[str, Any]]: One row per configuration, with its settings, the
+            number of documents and chunks, the indexing time and the scores.
+    """
+    raw_docs = process_pdfs(input_dir)
+    logger.info(f"Evaluating on {len(raw_docs)} papers from {len(set(doc['area'] for doc in raw_docs))} areas")
+
+    rows = []
+    embedding_functions = {embedder: make_embedding_function(embedder) for embedder in embedders}
+    for (embedder, backend, size, overlap), group in itertools.groupby(
+        sweep_configs(embedders, backends, max_sentences, overlaps, modes, queries),
+        key=lambda config: (config["embedder"], config["backend"], config["max_sentences"], config["overlap"]),
+    ):
+        documents, chunks = chunk_pdfs(raw_docs, max_sentences=size, overlap=overlap,
+                                       workers=workers or os.cpu_count() or 1)
+
+        with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+            indexer = make_indexer(backend, Path(tmp), embedding_function=embedding_functions[embedder])
+            start = time.perf_counter()
+            indexer.create_collection(documents=documents, chunks=chunks)
+            indexer.build_lexical_index()
+            index_seconds = time.perf_counter() - start
+
+            for config in group:
+                row = {**config, "documents": len(documents), "chunks": len(chunks), "index_seconds": index_seconds}
+                row.update(leave_one_out(indexer, raw_docs, mode=config["mode"], query=config["query"], k=k))
+                logger.info(f"Evaluated {config}")
+                rows.append(row)
+
+    columns = list(rows[0]) if rows else []
+    print("  ".join(f"{column:>13}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{row[column]:>13.4f}" if isinstance(row[column], float) else f"{row[column]:>13}"
+                        for column in columns))
+
+    if output:
+        Path(output).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+        logger.info(f"Report written to {output}")
+
+    return rows
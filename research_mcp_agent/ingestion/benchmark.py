@@ -0,0 +1,83 @@
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from research_mcp_agent.ingestion.indexer import BaseIndexer, ChromaIndexer
+from research_mcp_agent.ingestion.quantized import QuantizedIndexer
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_queries(indexer: BaseIndexer, queries: List[str], n_results: int) -> Tuple[List[List[str]], np.ndarray]:
+    """Run every query against one backend, returning the result IDs and latencies in ms."""
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = indexer.query([query], n_results=n_results)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(results['ids'])
+
+    return ids, np.asarray(latencies)
+
+
+def run_benchmark(n_queries: int = 50, n_results: int = 10,
+                  persist_directory: Path = Path(__file__).parent.parent / "vector_store") -> Dict[str, float]:
+    """
+    Compare the quantized backend against the exact ChromaDB backend.
+
+    Both stores must have been built with `create` (once per backend, without
+    sharding). Queries are
+    chunk texts sampled evenly from the corpus, and recall@k is the fraction of the
+    ChromaDB top-k that the quantized backend also returns.
+
+    Args:
+        n_queries (int): Number of sampled queries.
+        n_results (int): The k of recall@k.
+        persist_directory (Path): Root directory of the vector store.
+
+    Returns:
+        Dict[str, float]: Mean recall@k and p50/p95 latencies (ms) of both backends.
+
+    Raises:
+        RuntimeError: If either store is empty.
+    """
+    path_db = Path(persist_directory)
+    exact = ChromaIndexer(persist_directory=path_db)
+    approx = QuantizedIndexer(persist_directory=path_db / "quantized")
+
+    empty = "ChromaDB" if exact.collection.count() == 0 else "quantized" if approx.count() == 0 else None
+    if empty is not None:
+        exact.close()
+        approx.close()
+        backend = "chroma" if empty == "ChromaDB" else "quantized"
+        raise RuntimeError(f"The {empty} index is empty. Run 'create --backend {backend}' first.")
+
+    ids, texts, _ = exact.all_chunks()
+    sample = np.linspace(0, len(ids) - 1, num=min(n_queries, len(ids)), dtype=int)
+    queries = [texts[i] for i in sample]
+
+    exact_ids, exact_latency = _timed_queries(exact, queries, n_results)
+    approx_ids, approx_latency = _timed_queries(approx, queries, n_results)
+
+    recall = np.mean([
+        len(set(found) & set(expected)) / max(len(expected), 1)
+        for found, expected in zip(approx_ids, exact_ids)
+    ])
+
+    report = {
+        f"recall@{n_results}": float(recall),
+        "exact_p50_ms": float(np.percentile(exact_latency, 50)),
+        "exact_p95_ms": float(np.percentile(exact_latency, 95)),
+        "quantized_p50_ms": float(np.percentile(approx_latency, 50)),
+        "quantized_p95_ms": float(np.percentile(approx_latency, 95)),
+    }
+
+    for key, value in report.items():
+        logger.info(f"{key:>20}: {value:.4f}")
+
+    exact.close()
+    approx.close()
+    return report
@@ -0,0 +1,228 @@
+import re
+import numpy as np
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keeps acronyms and hyphenated terms ("covid-19", "bert") as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase the text and split it into alphanumeric terms.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        List[str]: The terms found in the text, in order.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        """
+        Compact inverted index scored with Okapi BM25.
+
+        Postings are stored in CSR layout: the vocabulary is kept sorted so that a
+        term is located with a binary search, and `indptr[t]:indptr[t + 1]` slices
+        the document positions and term frequencies of term `t`.
+
+        Args:
+            k1 (float): Term frequency saturation parameter.
+            b (float): Document length normalization parameter.
+        """
+        self.k1 = k1
+        self.b = b
+
+        self.ids = np.array([], dtype=str)
+        self.terms = np.array([], dtype=str)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_index = np.array([], dtype=np.int32)
+        self.term_freq = np.array([], dtype=np.uint16)
+        self.doc_len = np.array([], dtype=np.int32)
+        self.groups = np.array([], dtype=str)
+        self._rows_by_group: Optional[Dict[str, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: List[str], texts: List[str], groups: Optional[List[str]] = None) -> None:
+        """
+        Build the inverted index from chunk texts.
+
+        Args:
+            ids (List[str]): The chunk IDs, aligned with texts.
+            texts (List[str]): The chunk texts to index.
+            groups (List[str], optional): The document ID of every chunk, used to
+                restrict queries to a set of documents.
+        """
+        vocabulary: Dict[str, int] = {}
+        rows, cols, freqs = [], [], []
+        doc_len = np.zeros(len(texts), dtype=np.int32)
+
+        for d, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[d] = sum(counts.values())
+            for term, tf in counts.items():
+                rows.append(vocabulary.setdefault(term, len(vocabulary)))
+                cols.append(d)
+                freqs.append(min(tf, np.iinfo(np.uint16).max))
+
+        # Re-number terms in sorted order so lookups can use a binary search
+        terms = np.array(list(vocabulary), dtype=str)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[np.argsort(terms)] = np.arange(len(terms))
+        rows = rank[np.asarray(rows, dtype=np.int64)]
+        cols = np.asarray(cols, dtype=np.int32)
+        order = np.lexsort((cols, rows))
+
+        self.ids = np.array(ids, dtype=str)
+        self.terms = np.sort(terms)
+        self.indptr = np.r_[0, np.cumsum(np.bincount(rows, minlength=len(terms)))].astype(np.int64)
+        self.doc_index = cols[order]
+        self.term_freq = np.asarray(freqs, dtype=np.uint16)[order]
+        self.doc_len = doc_len
+        self.groups = np.array([group or "" for group in groups] if groups else [], dtype=str)
+        self._rows_by_group = None
+
+        logger.info(f"Built BM25 index with {len(self.ids)} chunks and {len(self.terms)} terms.")
+
+    def rows_of(self, groups: Set[str]) -> np.ndarray:
+        """Positions of the chunks belonging to the given documents, in index order."""
+        if self._rows_by_group is None:
+            order = np.argsort(self.groups, kind="stable")
+            keys, starts = np.unique(self.groups[order], return_index=True)
+            self._rows_by_group = dict(zip(keys.tolist(), np.split(order, starts[1:])))
+
+        rows = [self._rows_by_group[group] for group in groups if group in self._rows_by_group]
+        return np.sort(np.concatenate(rows)) if rows else np.array([], dtype=np.int64)
+
+    def query(self, query_text: str, n_results: int = 10, groups: Optional[Set[str]] = None,
+              exclude: Optional[Set[str]] = None) -> Tuple[List[str], List[float]]:
+        """
+        Rank the indexed chunks against a query.
+
+        Args:
+            query_text (str): The query string.
+            n_results (int): The maximum number of chunks to return.
+            groups (Set[str], optional): Only rank the chunks of these documents
+                (requires an index built with `groups`).
+            exclude (Set[str], optional): Documents left out of the corpus: their
+                chunks are not ranked and do not count in the document frequencies
+                and the average length, as if the index had been built without them.
+
+        Returns:
+            Tuple[List[str], List[float]]: The matching chunk IDs and their BM25 scores,
+                best first. Chunks sharing no term with the query are left out.
+        """
+        excluded = np.zeros(len(self.ids), dtype=bool)
+        if exclude:
+            excluded[self.rows_of(exclude)] = True
+
+        n_docs = len(self.ids) - int(excluded.sum())
+        if n_docs == 0:
+            return [], []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        avg_len = max(float(self.doc_len[~excluded].mean()), 1.0)
+
+        for term in set(tokenize(query_text)):
+            t = np.searchsorted(self.terms, term)
+            if t >= len(self.terms) or self.terms[t] != term:
+                continue
+
+            start, end = self.indptr[t], self.indptr[t + 1]
+            docs = self.doc_index[start:end]
+            tf = self.term_freq[start:end].astype(np.float32)
+
+            df = end - start - int(excluded[docs].sum())
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / avg_len)
+            # Every document appears at most once in a posting list
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        scores[excluded] = 0
+        if groups is not None:
+            rows = self.rows_of(groups)
+            matched = rows[scores[rows] > 0]
+        else:
+            matched = np.flatnonzero(scores)
+        if len(matched) > n_results:
+            matched = matched[np.argpartition(-scores[matched], n_results - 1)[:n_results]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+
+        return self.ids[matched].tolist(), scores[matched].tolist()
+
+    def save(self, path: Path) -> None:
+        """
+        Persist the index as a single uncompressed `.npz` file.
+
+        Args:
+            path (Path): Destination file.
+        """
+        np.savez(
+            path,
+            params=np.array([self.k1, self.b]),
+            ids=self.ids,
+            terms=self.terms,
+            indptr=self.indptr,
+            doc_index=self.doc_index,
+            term_freq=self.term_freq,
+            doc_len=self.doc_len,
+            groups=self.groups,
+        )
+        logger.info(f"BM25 index saved to {path}")
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """
+        Load an index previously written by `save`.
+
+        Args:
+            path (Path): The `.npz` file to read.
+
+        Returns:
+            BM25Index: The loaded index.
+        """
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            index.ids = data["ids"]
+            index.terms = data["terms"]
+            index.indptr = data["indptr"]
+            index.doc_index = data["doc_index"]
+            index.term_freq = data["term_freq"]
+            index.doc_len = data["doc_len"]
+            if "groups" in data:
+                index.groups = data["groups"]
+
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse several rankings of IDs with Reciprocal Rank Fusion.
+
+    Each ID receives `sum(1 / (k + rank))` over the rankings it appears in, so items
+    ranked well by both the lexical and the dense retriever rise to the top.
+
+    Args:
+        rankings (List[List[str]]): Lists of IDs, each ordered best first.
+        k (int): Smoothing constant damping the weight of top ranks (default: 60).
+
+    Returns:
+        List[Tuple[str, float]]: (ID, fused score) pairs ordered by decreasing score.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+
+    return sorted(fused.items(), key=lambda pair: pair[1], reverse=True)
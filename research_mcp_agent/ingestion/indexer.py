@@ -1,20 +1,53 @@
 import nltk
 import chromadb
+import hashlib
+import json
+import numpy as np
+import os
 import shutil
+import time
 from pathlib import Path
-from typing import List, Dict, Any
-from research_mcp_agent.ingestion.loader import process_pdfs
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from research_mcp_agent.ingestion.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from research_mcp_agent.ingestion.loader import iter_pdfs, list_pdfs
+from research_mcp_agent.dedup import MinHashIndex
+from research_mcp_agent.metrics import metrics
 
 # Download required NLTK resources
 nltk.download('punkt', quiet=True)
 nltk.download('punkt_tab', quiet=True)
 
-from nltk.tokenize import sent_tokenize
+from nltk.tokenize.punkt import PunktTokenizer
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=None)
+def _sentence_tokenizer(language: str = "english") -> PunktTokenizer:
+    """The Punkt model, loaded once per process (so once per chunking worker)."""
+    return PunktTokenizer(language)
+
+def _sentence_windows(n_sentences: int, max_sentences: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Sentence ranges [first, last) of the chunks of a text with n_sentences sentences.
+    Consecutive chunks share `overlap` sentences.
+    """
+    windows = []
+
+    i = 0
+    while i < n_sentences:
+        # Take max_sentences starting from current position
+        windows.append((i, min(i + max_sentences, n_sentences)))
+
+        # Move forward by (max_sentences - overlap) to create overlap
+        i += max_sentences - overlap
+
+    return windows
+
 def chunk_text_by_sentences(raw_text: str, max_sentences: int = 5, overlap: int = 1) -> List[str]:
     """
     Chunk text into smaller segments based on a maximum number of sentences with overlap.
@@ -28,167 +61,816 @@ def chunk_text_by_sentences(raw_text: str, max_sentences: int = 5, overlap: int
         list: A list of text chunks, each containing up to max_sentences sentences,
               with overlap sentences from the previous chunk.
     """
-    sentences = sent_tokenize(raw_text)
+    sentences = _sentence_tokenizer().tokenize(raw_text)
+
+    return [' '.join(sentences[first:last]) for first, last in _sentence_windows(len(sentences), max_sentences, overlap)]
+
+def sentence_spans(raw_text: str) -> List[Tuple[int, int]]:
+    """
+    Character offsets (start, end) of the sentences of a text.
+
+    Args:
+        raw_text (str): The input text.
+
+    Returns:
+        List[Tuple[int, int]]: One span per sentence, in order.
+    """
+    return list(_sentence_tokenizer().span_tokenize(raw_text))
+
+
+class ChunkRecord:
+    """
+    One chunk produced during ingestion.
+
+    Only the chunk-specific fields are kept: the document fields (title, authors,
+    keywords, area, filename) are stored once in the document table and referenced
+    by `doc_id`, instead of being copied into every chunk.
+    """
+
+    __slots__ = ("index", "doc_id", "position", "start", "end", "text")
+
+    def __init__(self, index: str, doc_id: str, position: int, start: int, end: int, text: str) -> None:
+        self.index = index
+        self.doc_id = doc_id
+        self.position = position
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def metadata(self) -> Dict[str, Any]:
+        """The metadata stored with the chunk in the vector store."""
+        return {"doc_id": self.doc_id, "position": self.position, "start": self.start, "end": self.end}
+
+
+# Document fields joined onto query results (the others stay in the document table)
+RESULT_DOCUMENT_FIELDS = ("title", "area", "filename")
+
+
+def document_id(doc: Dict[str, str]) -> str:
+    """Compact, stable ID of a source document: a short hash of its area and file name."""
+    key = f"{doc.get('area')}/{doc.get('filename')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+def _chunk_document(doc: Dict[str, str], max_sentences: int,
+                    overlap: int) -> Tuple[str, Dict[str, str], List[ChunkRecord], float]:
+    """
+    Chunk one document. Runs in the chunking workers, so it only uses its arguments.
+
+    Returns:
+        tuple: The document ID, its fields (without the text), its chunks and the
+               time spent, in seconds.
+    """
+    start_time = time.perf_counter()
+
+    content = doc.get('text', '')
+    doc_id = document_id(doc)
+    fields = {k: v for k, v in doc.items() if k != 'text'}
+
     chunks = []
-    
-    i = 0
-    while i < len(sentences):
-        # Take max_sentences starting from current position
-        chunk = ' '.join(sentences[i:i + max_sentences])
-        chunks.append(chunk)
-        
-        # Move forward by (max_sentences - overlap) to create overlap
-        i += max_sentences - overlap
-    
-    return chunks
+    spans = sentence_spans(content)
+    for position, (first, last) in enumerate(_sentence_windows(len(spans), max_sentences, overlap)):
+        text = ' '.join(content[start:end] for start, end in spans[first:last])
+        chunks.append(ChunkRecord(
+            index=f"{doc_id}-{position}",
+            doc_id=doc_id,
+            position=position,
+            start=spans[first][0],
+            end=spans[last - 1][1],
+            text=text,
+        ))
 
-def chunk_pdfs(documents: List[Dict[str, str]], max_sentences: int = 5, overlap: int = 1) -> List[Dict[str, str]]:
+    return doc_id, fields, chunks, time.perf_counter() - start_time
+
+def chunk_pdfs(documents: Iterable[Dict[str, str]], max_sentences: int = 5, overlap: int = 1,
+               workers: int = 1) -> Tuple[Dict[str, Dict[str, str]], List[ChunkRecord]]:
     """
     Chunk the 'text' of each PDF document in the list into smaller segments
     based on a maximum number of sentences with overlap.
 
+    With several workers, documents are tokenized in a process pool where each
+    worker loads the Punkt model once. Documents are submitted as the iterable
+    yields them, so chunking runs alongside a lazy producer such as `iter_pdfs`,
+    and results are collected in submission order, so the output is the same as
+    with a single worker.
+
     Args:
-        documents (list): A list of dictionaries, each containing a 'text' key with text.
+        documents (iterable): Dictionaries, each containing a 'text' key with text.
         max_sentences (int): The maximum number of sentences per chunk.
         overlap (int): The number of sentences to overlap between chunks (default: 1).
+        workers (int): Number of chunking processes (1 chunks on the calling thread).
 
     Returns:
-        list: A new list of dictionaries where each original document is replaced
-              by its chunks, each represented as a separate dictionary.
-    """
-    chunked_documents = []
-    global_index = 0
-    for doc in documents:
-        content = doc.get('text', '')
-        chunks = chunk_text_by_sentences(content, max_sentences, overlap)
-        
-        for chunk in chunks:
-            new_doc = doc.copy()
-            new_doc['text'] = chunk
-            new_doc['index'] = f"id{global_index}"
-            chunked_documents.append(new_doc)
-            global_index += 1
+        tuple: The document table, mapping each document ID to the document fields
+               (without the text), and the chunks of every document. Chunk IDs are
+               '<doc_id>-<position>', so they stay unique across ingestion runs.
+    """
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_sentence_tokenizer) as executor:
+            futures = [executor.submit(_chunk_document, doc, max_sentences, overlap) for doc in documents]
+            chunked = [future.result() for future in futures]
+    else:
+        chunked = [_chunk_document(doc, max_sentences, overlap) for doc in documents]
+
+    table = {}
+    chunks = []
+    for doc_id, fields, doc_chunks, seconds in chunked:
+        table[doc_id] = fields
+        chunks += doc_chunks
+
+        metrics.observe("ingestion.chunk_seconds", seconds)
+        metrics.increment("ingestion.chunk.documents")
+        metrics.increment("ingestion.chunk.chunks", len(doc_chunks))
     
-    return chunked_documents
+    return table, chunks
+
+
+def log_stage_throughput(stages: Tuple[str, ...] = ("extract", "chunk", "index")) -> None:
+    """
+    Log the throughput of each ingestion stage, from the `ingestion.*` metrics.
+
+    The time of a stage is its busy time (summed over documents and workers), so
+    the figures stay comparable when stages overlap or run in parallel.
+    """
+    snapshot = metrics.snapshot()
+    for stage in stages:
+        timing = snapshot.get(f"ingestion.{stage}_seconds")
+        if not timing or not timing["total"]:
+            continue
+
+        documents = snapshot.get(f"ingestion.{stage}.documents", {}).get("value", timing["count"])
+        logger.info(f"Stage '{stage}': {documents:.0f} documents in {timing['total']:.2f}s "
+                    f"({documents / timing['total']:.1f} documents/s)")
+
+class BaseIndexer:
+    def __init__(self, persist_directory: Path) -> None:
+        """
+        Shared search logic for the vector store backends.
+
+        Subclasses implement storage (`create_collection`, `get`, `all_chunks`) and
+        dense similarity (`dense_query`); lexical and hybrid search are built on top.
+
+        Chunks only carry a document ID, position and offsets; the document fields
+        are kept once in a document table (`documents.json`) and joined onto the
+        results with `join_documents`. Lookups from area, filename and title/keyword
+        terms to document IDs are built from the table, so filtered queries only
+        search the chunks of the matching documents.
+
+        Args:
+            persist_directory (Path): Directory path for persistent storage.
+        """
+        self.path_dir = Path(persist_directory)
+        self.path_dir.mkdir(parents=True, exist_ok=True)
+
+        self.documents_path = self.path_dir / "documents.json"
+        self.documents: Dict[str, Dict[str, Any]] = (
+            json.loads(self.documents_path.read_text(encoding="utf-8")) if self.documents_path.exists() else {}
+        )
+        self._index_documents()
+
+        # Optional BM25 side index used by the lexical and hybrid search modes
+        self.lexical_path = self.path_dir / "bm25.npz"
+        self.lexical_index = BM25Index.load(self.lexical_path) if self.lexical_path.exists() else None
+
+    def create_collection(self, documents: Dict[str, Dict[str, str]], chunks: List[ChunkRecord]) -> None:
+        """
+        Add chunks to the store. The chunks of documents already in the store (a
+        changed PDF ingested again) replace their old chunks. Does nothing without chunks.
+
+        Args:
+            documents: Document table from `chunk_pdfs` (document ID -> fields).
+            chunks: Chunk records from `chunk_pdfs`.
+        """
+        raise NotImplementedError
+
+    def add_documents(self, documents: Dict[str, Dict[str, str]]) -> None:
+        """Merge documents into the document table and persist it atomically."""
+        self.documents.update(documents)
+
+        tmp_path = self.documents_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self.documents, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.documents_path)
+        self._index_documents()
+
+    def _index_documents(self) -> None:
+        """Build the secondary lookups of the document table (case-insensitive)."""
+        self._docs_by_area: Dict[str, Set[str]] = defaultdict(set)
+        self._docs_by_filename: Dict[str, Set[str]] = defaultdict(set)
+        self._docs_by_term: Dict[str, Set[str]] = defaultdict(set)
+
+        for doc_id, doc in self.documents.items():
+            self._docs_by_area[str(doc.get('area')).lower()].add(doc_id)
+            self._docs_by_filename[str(doc.get('filename')).lower()].add(doc_id)
+            for term in tokenize(f"{doc.get('title') or ''} {doc.get('keywords') or ''}"):
+                self._docs_by_term[term].add(doc_id)
+
+    def match_documents(self, area: Optional[str] = None, filename: Optional[str] = None,
+                        keyword: Optional[str] = None) -> Optional[Set[str]]:
+        """
+        Resolve metadata filters to the IDs of the matching documents.
+
+        Args:
+            area (str, optional): Research area.
+            filename (str, optional): Source file name.
+            keyword (str, optional): Terms that must all appear in the title or keywords.
+
+        Returns:
+            Optional[Set[str]]: The matching document IDs, None when no filter is set.
+                Empty strings, which MCP clients often send for unset optional
+                parameters, do not filter.
+        """
+        candidates = []
+        if area and area.strip():
+            candidates.append(self._docs_by_area.get(area.strip().lower(), set()))
+        if filename and filename.strip():
+            candidates.append(self._docs_by_filename.get(filename.strip().lower(), set()))
+        if keyword:
+            candidates += [self._docs_by_term.get(term, set()) for term in tokenize(keyword)]
+
+        if not candidates:
+            return None
+
+        return set.intersection(*candidates)
+
+    def join_documents(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the document fields (title, area, filename) to flattened results,
+        looked up by their 'doc_id' column.
+        """
+        doc_ids = results.get('doc_id')
+        if doc_ids is None:
+            return results
+
+        for field in RESULT_DOCUMENT_FIELDS:
+            results[field] = [self.documents.get(doc_id, {}).get(field) for doc_id in doc_ids]
+
+        return results
+
+    def get(self, ids: List[str]) -> Dict[str, Any]:
+        """
+        Fetch chunks by ID.
+
+        Args:
+            ids (List[str]): The chunk IDs to retrieve.
+
+        Returns:
+            Dict[str, Any]: The chunks in the requested order, flattened like `query`
+                (without distances). Unknown IDs are skipped.
+        """
+        raise NotImplementedError
+
+    def all_chunks(self) -> Tuple[List[str], List[str], List[Optional[str]]]:
+        """Return the IDs, texts and document IDs of every stored chunk."""
+        raise NotImplementedError
+
+    def export(self) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Return the document table, every chunk record ('id', 'text', 'metadata') and
+        their stored embeddings (None when the store is empty), so a snapshot can be
+        written without embedding the corpus again.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release the files and clients held by the store."""
+
+    def dense_query(self, query_texts: List[str], n_results: int,
+                    doc_ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Embedding similarity search for the first query, flattened with 'distances'.
+        When doc_ids is given, only the chunks of these documents are searched.
+        """
+        raise NotImplementedError
+
+    def lexical_query(self, query_text: str, n_results: int, doc_ids: Optional[Set[str]] = None,
+                      exclude: Optional[Set[str]] = None) -> Optional[Tuple[List[str], List[float]]]:
+        """
+        BM25 search, returning the chunk IDs and scores best first. When doc_ids is
+        given, only the chunks of these documents are searched; the documents in
+        exclude are also left out of the BM25 statistics. None when the BM25 index
+        is missing (or predates filtered search and a filter is set).
+        """
+        if self.lexical_index is None:
+            logger.warning(f"No BM25 index found at {self.lexical_path}, falling back to dense search.")
+            return None
+
+        if (doc_ids is not None or exclude) and len(self.lexical_index.groups) == 0:
+            logger.warning("The BM25 index predates filtered search, run 'create' again. Using dense search.")
+            return None
+
+        return self.lexical_index.query(query_text, n_results, groups=doc_ids, exclude=exclude)
+
+    def build_lexical_index(self) -> None:
+        """
+        Build the BM25 side index from every stored chunk and persist it next to
+        the vector store, so both indexes always cover the same chunks.
+        """
+        logger.info("Running build_lexical_index()...")
+        ids, texts, doc_ids = self.all_chunks()
+
+        self.lexical_index = BM25Index()
+        self.lexical_index.build(ids=ids, texts=texts, groups=doc_ids)
+        self.lexical_index.save(self.lexical_path)
+
+    def query(self, query_texts: List[str], n_results: int = 1, mode: str = "dense",
+              area: Optional[str] = None, filename: Optional[str] = None,
+              keyword: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Query the collection for similar items based on input text.
+        
+        Args:
+            query_texts (List[str]): A list of query strings to search for in the collection.
+            n_results (int, optional): The number of results to return for each query. Defaults to 1.
+            mode (str, optional): 'dense' for embedding similarity, 'lexical' for BM25 or
+                'hybrid' for both rankings fused with Reciprocal Rank Fusion. The lexical
+                modes only use the first query and fall back to 'dense' when no BM25
+                index was built. Defaults to 'dense'.
+            area (str, optional): Only search chunks from this area. Defaults to None.
+            filename (str, optional): Only search chunks from this file. Defaults to None.
+            keyword (str, optional): Only search documents whose title or keywords
+                contain all these terms. Defaults to None.
+        
+        Returns:
+            Dict[str, Any]: A dictionary containing the query results from the collection.
+                Dense results carry 'distances' (lower is better); lexical and hybrid
+                results carry 'scores' (higher is better).
+        """
+        # Filters are resolved to document IDs before searching, not applied to the hits
+        doc_ids = self.match_documents(area=area, filename=filename, keyword=keyword)
+        return self.search(query_texts, n_results=n_results, mode=mode, doc_ids=doc_ids)
 
-class ChromaIndexer:
-    def __init__(self, persist_directory: Path = Path(__file__).parent.parent / "vector_store") -> None:
+    def search(self, query_texts: List[str], n_results: int = 1, mode: str = "dense",
+               doc_ids: Optional[Set[str]] = None, exclude: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Search the chunks of the given documents (all of them when doc_ids is None).
+        The documents in exclude are searched as if they had never been indexed:
+        they are left out of the results and of the BM25 statistics (used by the
+        leave-one-out evaluation). See `query` for the other arguments and the output.
+        """
+        if mode not in ("dense", "lexical", "hybrid"):
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        if exclude:
+            doc_ids = (set(self.documents) if doc_ids is None else doc_ids) - exclude
+
+        if doc_ids is not None and not doc_ids:
+            return {'ids': [], 'documents': [], 'distances' if mode == "dense" else 'scores': []}
+
+        lexical = self.lexical_query(query_texts[0], n_results, doc_ids=doc_ids,
+                                     exclude=exclude) if mode != "dense" else None
+        if lexical is None:
+            mode = "dense"
+
+        if mode == "lexical":
+            ranked = lexical
+        else:
+            output = self.dense_query(query_texts, n_results, doc_ids=doc_ids)
+            if mode == "dense":
+                return output
+
+            ranked = list(zip(*reciprocal_rank_fusion([output['ids'], lexical[0]])[:n_results]))
+
+        if not ranked or not ranked[0]:
+            return {'ids': [], 'documents': [], 'scores': []}
+
+        ranked_ids, scores = ranked
+        output = self.get(list(ranked_ids))
+        score_by_id = dict(zip(ranked_ids, scores))
+        output['scores'] = [score_by_id[chunk_id] for chunk_id in output['ids']]
+
+        return output
+
+
+class ChromaIndexer(BaseIndexer):
+    def __init__(self, persist_directory: Path = Path(__file__).parent.parent / "vector_store",
+                 embedding_function: Optional[Any] = None) -> None:
         """
         Initialize a ChromaDB client with persistent storage.
 
         Args:
             persist_directory (Path): Directory path for persistent storage.
+            embedding_function: Callable embedding a list of texts. Defaults to
+                ChromaDB's default embedder.
         """
-        path_dir = Path(persist_directory)
-        path_dir.mkdir(parents=True, exist_ok=True)
+        super().__init__(persist_directory)
 
         # Use PersistentClient
         self.client = chromadb.PersistentClient(path=persist_directory)
 
-        self.collection = self.client.get_or_create_collection(name="scientific_articles")
-        if self.collection.count() == 0:
+        if embedding_function is None:
+            self.collection = self.client.get_or_create_collection(name="scientific_articles")
+        else:
+            self.collection = self.client.get_or_create_collection(name="scientific_articles",
+                                                                   embedding_function=embedding_function)
+        count = self.collection.count()
+        if count == 0:
             logger.info("The ChromaDB collection is empty. Run create_collection() to initialize it.")
         else:
-            logger.info(f"Loaded existing collection with {self.collection.count()} documents.")
+            logger.info(f"Loaded existing collection with {count} documents.")
         
-    def create_collection(self, documents: List[Dict[str, str]]) -> None:
+    def create_collection(self, documents: Dict[str, Dict[str, str]], chunks: List[ChunkRecord]) -> None:
         """
         Add documents to the ChromaDB collection.
         
         Args:
-            documents: List of dicts with 'text', 'index', and any other metadata fields
+            documents: Document table from `chunk_pdfs` (document ID -> fields)
+            chunks: Chunk records from `chunk_pdfs`
         """
-        texts = []
-        metadatas = []
-        ids = []
-
         logger.info("Running create_collection()...")
-        
-        for doc in documents:
-            # Extract text (required)
-            texts.append(doc['text'])
-            
-            # Extract ID (required)
-            ids.append(str(doc['index']))  # Ensure ID is a string
-            
-            # Extract all other keys as metadata
-            metadata = {k: v for k, v in doc.items() if k not in ['text', 'index']}
-            # If no metadata exists, add a placeholder
-            if not metadata:
-                metadata = {'source': 'default'}
-            
-            metadatas.append(metadata)
+        if not chunks:
+            logger.info("No new documents to add.")
+            return
+
+        replaced = sorted(set(documents) & set(self.documents))
+        if replaced:
+            logger.info(f"Replacing the chunks of {len(replaced)} changed documents.")
+            self.collection.delete(where={"doc_id": {"$in": replaced}})
+
+        self.add_documents(documents)
+        ids, texts, metadatas = split_documents(chunks)
         
         self.collection.add(
             documents=texts,
             metadatas=metadatas,
             ids=ids
         )
-        logger.info(f"Added {len(documents)} documents. Total in collection: {self.collection.count()}")
+        logger.info(f"Added {len(chunks)} documents. Total in collection: {self.collection.count()}")
+
+    def all_chunks(self) -> Tuple[List[str], List[str], List[Optional[str]]]:
+        stored = self.collection.get(include=["documents", "metadatas"])
+        doc_ids = [(metadata or {}).get('doc_id') for metadata in stored['metadatas']]
+        return stored['ids'], stored['documents'], doc_ids
+
+    def export(self) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]], Optional[np.ndarray]]:
+        stored = self.collection.get(include=["documents", "metadatas", "embeddings"])
+        records = [
+            {"id": chunk_id, "text": text, "metadata": metadata}
+            for chunk_id, text, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        ]
+        vectors = np.asarray(stored['embeddings'], dtype=np.float32) if records else None
+        return dict(self.documents), records, vectors
+
+    def close(self) -> None:
+        # ChromaDB shares one database handle per path until its last client is closed
+        if hasattr(self.client, "close"):
+            self.client.close()
+
+    def get(self, ids: List[str]) -> Dict[str, Any]:
+        results = self.collection.get(ids=ids, include=["documents", "metadatas"])
+
+        # ChromaDB does not guarantee the order of the returned records
+        position = {chunk_id: i for i, chunk_id in enumerate(results['ids'])}
+        order = [position[chunk_id] for chunk_id in ids if chunk_id in position]
+
+        return self.join_documents(flatten_results(
+            ids=[results['ids'][i] for i in order],
+            documents=[results['documents'][i] for i in order],
+            metadatas=[results['metadatas'][i] for i in order],
+        ))
+
+    def dense_query(self, query_texts: List[str], n_results: int,
+                    doc_ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        # Pre-filter in ChromaDB's metadata index instead of discarding hits afterwards
+        where = {"doc_id": {"$in": sorted(doc_ids)}} if doc_ids is not None else None
 
-    def query(self, query_texts: List[str], n_results: int = 1) -> Dict[str, Any]:
-        """
-        Query the collection for similar items based on input text.
-        
-        Args:
-            query_texts (List[str]): A list of query strings to search for in the collection.
-            n_results (int, optional): The number of results to return for each query. Defaults to 1.
-        
-        Returns:
-            Dict[str, Any]: A dictionary containing the query results from the collection.
-        """
         results = self.collection.query(
             query_texts=query_texts,
             n_results=n_results,
+            where=where,
             include=["metadatas", "distances", "documents"]
         )
 
         # Flatten the ChromaDB result structure
-        output = {
-            'ids': results['ids'][0] if results.get('metadatas') else [],
-            'documents': results['documents'][0] if results.get('documents') else [],
-            'distances': results['distances'][0] if results.get('distances') else [],
-        }
-
-        # Flatten metadata keys into top-level dictionary
-        if results.get('metadatas') and results['metadatas'][0]:
-            # Collect all unique metadata keys
-            all_metadata_keys = set()
-            for metadata in results['metadatas'][0]:
-                all_metadata_keys.update(metadata.keys())
-            
-            # Create a list for each metadata key
-            for key in all_metadata_keys:
-                output[key] = [
-                    metadata.get(key, None) for metadata in results['metadatas'][0]
-                ]
-        
-        return output
+        output = flatten_results(
+            ids=results['ids'][0] if results.get('metadatas') else [],
+            documents=results['documents'][0] if results.get('documents') else [],
+            metadatas=results['metadatas'][0] if results.get('metadatas') else [],
+        )
+        output['distances'] = results['distances'][0] if results.get('distances') else []
+
+        return self.join_documents(output)
+
+
+def split_documents(chunks: List[ChunkRecord]) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    """
+    Split chunk records into the parallel lists expected by the vector stores.
+
+    Args:
+        chunks: Chunk records from `chunk_pdfs`
+
+    Returns:
+        Tuple[List[str], List[str], List[Dict[str, Any]]]: The IDs, texts and metadata dicts.
+    """
+    ids = [chunk.index for chunk in chunks]
+    texts = [chunk.text for chunk in chunks]
+    metadatas = [chunk.metadata() for chunk in chunks]
+
+    return ids, texts, metadatas
+
+
+def flatten_results(ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Flatten per-chunk metadata dictionaries into one list per metadata key."""
+    output = {
+        'ids': ids,
+        'documents': documents,
+    }
+
+    # Collect all unique metadata keys
+    all_metadata_keys = set()
+    for metadata in metadatas:
+        all_metadata_keys.update(metadata or {})
+
+    # Create a list for each metadata key
+    for key in all_metadata_keys:
+        output[key] = [(metadata or {}).get(key, None) for metadata in metadatas]
+
+    return output
+
+
+def group_hits_by_article(results: Dict[str, Any], n_articles: int, key: str = "filename",
+                          snippet_chars: int = 300) -> List[Dict[str, Any]]:
+    """
+    Collapse chunk-level query hits into distinct articles.
+
+    Overlapping chunks of the same PDF tend to crowd the top of the ranking, so the
+    hits are grouped by `key` and each article keeps its best score, the number of
+    chunks that matched and the text of its best-matching chunk. Dense results are
+    ranked by 'distances' (lower is better), lexical and hybrid results by 'scores'
+    (higher is better).
+
+    Args:
+        results (Dict[str, Any]): Flattened output of `ChromaIndexer.query`.
+        n_articles (int): The number of distinct articles to return.
+        key (str): Metadata field identifying the source article (default: 'filename').
+        snippet_chars (int): Maximum length of the returned snippet.
+
+    Returns:
+        List[Dict[str, Any]]: Up to n_articles dictionaries, ordered by best score, with
+            the keys 'id' (best chunk), 'title', 'area', 'filename', 'score',
+            'mean_score', 'hits' and 'snippet'.
+    """
+    ids = results.get('ids', [])
+    if not ids:
+        return []
+
+    # Work with "lower is better" values and restore the sign on output
+    sign = 1.0 if 'distances' in results else -1.0
+    distances = sign * np.asarray(results['distances' if sign > 0 else 'scores'], dtype=np.float64)
+    # Chunks without the grouping key are treated as their own article
+    articles = [k if k is not None else i for i, k in zip(ids, results.get(key, [None] * len(ids)))]
+    unique_articles, group = np.unique(np.asarray(articles, dtype=object), return_inverse=True)
+    n_groups = len(unique_articles)
+
+    # Per-article aggregates
+    hits = np.bincount(group, minlength=n_groups)
+    mean_score = np.bincount(group, weights=distances, minlength=n_groups) / hits
+    best_score = np.full(n_groups, np.inf)
+    np.minimum.at(best_score, group, distances)
+
+    # Index of the best chunk of every article: sort by (article, distance) and keep the first
+    order = np.lexsort((distances, group))
+    starts = np.r_[0, np.flatnonzero(np.diff(group[order])) + 1]
+    best_chunk = order[starts]
+
+    # Metadata columns may be missing if no chunk carried the field
+    empty = [None] * len(ids)
+    documents = results.get('documents') or [""] * len(ids)
+    titles, areas, filenames = (results.get(k) or empty for k in ('title', 'area', 'filename'))
+
+    output = []
+    for g in np.argsort(best_score, kind="stable")[:n_articles]:
+        i = best_chunk[g]
+        output.append({
+            "id": ids[i],
+            "title": titles[i] or "Unknown",
+            "area": areas[i] or "Unknown",
+            "filename": filenames[i] or "Unknown",
+            "score": float(sign * best_score[g]),
+            "mean_score": float(sign * mean_score[g]),
+            "hits": int(hits[g]),
+            "snippet": (documents[i] or "")[:snippet_chars],
+        })
+
+    return output
+
+
+def query_articles(indexer: "BaseIndexer", query: str, n_articles: int, overfetch_factor: int = 5,
+                   **query_kwargs: Any) -> List[Dict[str, Any]]:
+    """
+    Query an indexer for the n_articles best distinct articles.
+
+    Overlapping chunks of one PDF crowd the ranking, so n_articles * overfetch_factor
+    chunks are fetched and grouped with `group_hits_by_article`. While that yields
+    fewer than n_articles articles, the fetch is doubled, until there are enough
+    articles or the store has no more matching chunks. Fewer than n_articles are
+    returned only when fewer articles match.
+
+    Args:
+        indexer (BaseIndexer): The store to query.
+        query (str): The query text.
+        n_articles (int): The number of distinct articles to return.
+        overfetch_factor (int): Chunks fetched per requested article on the first try.
+        **query_kwargs: Passed to `indexer.query` (mode, area, filename, keyword).
+
+    Returns:
+        List[Dict[str, Any]]: Up to n_articles articles, as in `group_hits_by_article`.
+    """
+    n_chunks = max(n_articles * overfetch_factor, 1)
+    while True:
+        results = indexer.query(query_texts=[query], n_results=n_chunks, **query_kwargs)
+        articles = group_hits_by_article(results, n_articles=n_articles)
+        if len(articles) >= n_articles or len(results.get("ids", [])) < n_chunks:
+            return articles
+
+        logger.debug(f"{len(articles)} of {n_articles} articles in {n_chunks} chunks, fetching more")
+        n_chunks *= 2
+
+
+def make_indexer(backend: str, persist_directory: Path, embedding_function: Optional[Any] = None) -> BaseIndexer:
+    """
+    Open a single (unsharded) store of the given backend.
+
+    Args:
+        backend (str): 'chroma' or 'quantized'.
+        persist_directory (Path): Directory of the store.
+        embedding_function: Callable embedding a list of texts, defaults to
+            ChromaDB's default embedder.
+
+    Returns:
+        BaseIndexer: The opened store.
+    """
+    if backend == "quantized":
+        from research_mcp_agent.ingestion.quantized import QuantizedIndexer
+        return QuantizedIndexer(persist_directory=persist_directory, embedding_function=embedding_function)
+
+    return ChromaIndexer(persist_directory=persist_directory, embedding_function=embedding_function)
+
+
+def open_indexer(persist_directory: Path = Path(__file__).parent.parent / "vector_store",
+                 prefer_snapshot: bool = True) -> BaseIndexer:
+    """
+    Open the vector store recorded by `run_create` in `index.json`.
+
+    Args:
+        persist_directory (Path): Root directory of the vector store.
+        prefer_snapshot (bool): Serve the current snapshot (`vector_store/snapshots/`)
+            when one was published with `run_create(snapshot=True)`.
+
+    Returns:
+        BaseIndexer: A `SnapshotIndexer` when a snapshot exists and is not older than
+            the store, a `ShardedIndexer` when the store was sharded, otherwise a
+            `QuantizedIndexer` or `ChromaIndexer` depending on the backend.
+    """
+    path_dir = Path(persist_directory)
+
+    config_path = path_dir / "index.json"
+    config = json.loads(config_path.read_text(encoding="utf-8")) if config_path.exists() else {}
+    backend = config.get("backend", "chroma")
+
+    # A published snapshot is preferred: it opens instantly and stays readable while re-indexing
+    from research_mcp_agent.ingestion.snapshot import SnapshotIndexer, current_snapshot
+    snapshot_path = current_snapshot(path_dir / "snapshots") if prefer_snapshot else None
+    if snapshot_path is not None:
+        manifest = json.loads((snapshot_path / "snapshot.json").read_text(encoding="utf-8"))
+        if (config.get("updated_at") or 0) <= manifest["created_at"]:
+            return SnapshotIndexer(path_dir / "snapshots")
+        logger.warning(f"Snapshot {snapshot_path.name} is older than the vector store, which a later 'create' "
+                       f"without --snapshot changed. Serving the store; run 'create --snapshot' to publish it.")
+
+    if config.get("shard_by"):
+        from research_mcp_agent.ingestion.sharding import ShardedIndexer
+        return ShardedIndexer(persist_directory=path_dir / "shards", shard_by=config["shard_by"],
+                              make_shard=lambda path: make_indexer(backend, path))
+
+    if backend == "quantized":
+        return make_indexer(backend, path_dir / "quantized")
+
+    return make_indexer(backend, path_dir)
 
     
-def run_create(input_dir: str = "data/raw_articles/", reset_db: bool = False) -> None:
+def run_create(input_dir: str = "data/raw_articles/", reset_db: bool = False, backend: str = "chroma",
+               shard_by: Optional[str] = None, n_shards: int = 4, dedup_threshold: float = 0.9,
+               workers: Optional[int] = None, snapshot: bool = False,
+               persist_directory: Path = Path(__file__).parent.parent / "vector_store") -> None:
     """
     Main function to process PDFs, chunk text, and create a ChromaDB vector store.
     Args:
         input_dir (str): Directory containing structured folders with PDF files.
-        reset_db (bool): Whether to reset the vector store database if it exists.
+        reset_db (bool): Whether to reset the vector store database if it exists. Only
+            the store of this backend is reset, the other backend keeps its store. When
+            sharding, only the shards of the input files are reset (with their entries
+            in the near-duplicate index), so a single area can be re-indexed without
+            touching the others.
+        backend (str): 'chroma' for the ChromaDB store or 'quantized' for the int8
+            memory-mapped store. The MCP server opens the backend built last.
+        shard_by (str, optional): 'area' or 'hash' to split the store into one
+            sub-directory per shard under `vector_store/shards/`.
+        n_shards (int): Number of shards used by the 'hash' strategy.
+        dedup_threshold (float): Estimated Jaccard similarity above which a PDF is a
+            near-duplicate of an already indexed one and is not embedded again.
+        workers (int, optional): Number of sentence tokenization processes, which
+            run while the PDFs are being extracted. Defaults to the number of CPUs.
+        snapshot (bool): Also publish the store as a new read-only snapshot version
+            (`vector_store/snapshots/`), which the MCP server opens instead of the
+            store and switches to without a restart. Snapshots survive reset_db, so
+            a running server keeps answering while the store is rebuilt.
+        persist_directory (Path): Root directory of the vector store.
     """
-    # Load and clead pdf files, add metadata
+    # Path for vector store
+    path_db = Path(persist_directory)
+
+    config_path = path_db / "index.json"
+    previous = json.loads(config_path.read_text(encoding="utf-8")) if config_path.exists() else {}
+
+    # Near-duplicate index of the PDFs ingested into this store, kept in the store's own
+    # directory: a PDF indexed by another backend or shard layout is not in this store yet
+    if shard_by:
+        store_dir = path_db / "shards"
+    else:
+        store_dir = path_db / "quantized" if backend == "quantized" else path_db
+    minhash_path = store_dir / "minhash.npz"
+
+    # The shards directory holds the layout of the last sharded run; another layout starts over
+    layout = (backend, shard_by, n_shards if shard_by == "hash" else None)
+    other_layout = bool(previous.get("shard_by")) and layout != (previous.get("backend"), previous.get("shard_by"),
+                                                                  previous.get("n_shards"))
+    if minhash_path.exists() and not (reset_db and not shard_by) and not (shard_by and other_layout):
+        duplicates = MinHashIndex.load(minhash_path, threshold=dedup_threshold)
+    else:
+        duplicates = MinHashIndex(threshold=dedup_threshold)
+
+    if shard_by:
+        from research_mcp_agent.ingestion.sharding import ShardedIndexer, shard_name
+
+        # The shards of the input files are the ones rebuilt by reset_db
+        input_shards = {shard_name({'area': pdf.parent.name, 'filename': pdf.name}, shard_by, n_shards)
+                        for pdf in list_pdfs(input_dir)}
+        if reset_db:
+            # Forget the files of these shards only, the other shards keep their documents
+            reset_keys = [key for key in duplicates.keys
+                          if shard_name(dict(zip(('area', 'filename'), key.split("/", 1))), shard_by, n_shards)
+                          in input_shards]
+            duplicates.remove(reset_keys)
+
+    # Load and clead pdf files, add metadata (lazily, chunking starts with the first PDF)
     path_dir = Path(input_dir)
-    docs = process_pdfs(directory=path_dir)
+    docs = iter_pdfs(directory=path_dir, duplicates=duplicates)
 
-    # Chunk text
-    docs = chunk_pdfs(documents=docs, max_sentences=8, overlap=1)
-    
-    # Path for vector store
-    path_db = Path(__file__).parent.parent / "vector_store"
-    # Reset DB if needed
-    if reset_db and path_db.exists():
-        shutil.rmtree(path_db)
-    
-    # Create vector store
-    vector_db = ChromaIndexer(persist_directory=path_db)
-    vector_db.create_collection(documents=docs)
+    # Chunk text, the document fields are kept once in the document table
+    documents, chunks = chunk_pdfs(documents=docs, max_sentences=8, overlap=1,
+                                   workers=workers or os.cpu_count() or 1)
+    metrics.increment("ingestion.index.documents", len(documents))
+    if not chunks:
+        logger.info("No new or changed documents to index.")
+
+    if shard_by:
+        touched = {shard_name(doc, shard_by, n_shards) for doc in documents.values()}
+
+        # Reset only the shards being rebuilt
+        vector_db = ShardedIndexer(persist_directory=path_db / "shards", shard_by=shard_by,
+                                   make_shard=lambda path: make_indexer(backend, path),
+                                   reset=input_shards if reset_db else ())
+
+        with metrics.timer("ingestion.index_seconds"):
+            vector_db.create_collection(documents=documents, chunks=chunks, n_shards=n_shards)
+            for name in touched:
+                vector_db.shard(name).build_lexical_index()
+    else:
+        # Reset DB if needed, leaving the stores of the other backend and layouts (and the snapshots) alone
+        if reset_db and store_dir.exists():
+            keep = {"quantized", "shards", "snapshots", "index.json"} if backend != "quantized" else set()
+            for path in store_dir.iterdir():
+                if path.name in keep:
+                    continue
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+
+        # Create vector store
+        vector_db = make_indexer(backend, store_dir)
+        if chunks:
+            with metrics.timer("ingestion.index_seconds"):
+                vector_db.create_collection(documents=documents, chunks=chunks)
+                vector_db.build_lexical_index()
+
+    # Record which store the MCP server should open, and when its content last changed
+    changed = bool(chunks) or reset_db or (previous.get("backend"), previous.get("shard_by")) != (backend, shard_by)
+    config = {"backend": backend, "shard_by": shard_by, "n_shards": n_shards if shard_by == "hash" else None,
+              "updated_at": time.time() if changed else previous.get("updated_at")}
+    config_path.write_text(json.dumps(config, indent=2), encoding="utf-8")
+    duplicates.save(minhash_path)
+
+    from research_mcp_agent.ingestion.snapshot import current_snapshot, write_snapshot
+    if changed and not snapshot and current_snapshot(path_db / "snapshots") is not None:
+        logger.warning("The store changed since the last snapshot: the MCP server opens the store instead on "
+                       "its next start, running servers keep serving the snapshot. Use --snapshot to publish it.")
+
+    if snapshot:
+        with metrics.timer("ingestion.snapshot_seconds"):
+            write_snapshot(vector_db, path_db / "snapshots", backend=backend)
+
+    vector_db.close()
+    log_stage_throughput()
     
     # Test retrieve
     # results = vector_db.query(["Sentence talking about machine learning."], n_results=2)
@@ -1,7 +1,11 @@
 import re
+import numpy as np
 from pypdf import PdfReader
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
+
+from research_mcp_agent.dedup import MinHashIndex
+from research_mcp_agent.metrics import metrics
 
 import logging
 
@@ -95,13 +99,76 @@ def clean_text(raw_text: str) -> str:
 
     return text.strip()
 
-def process_pdfs(directory: str="data/raw_articles/") -> List[Dict[str, str]]:
+def list_pdfs(directory: str="data/raw_articles/") -> List[Path]:
+    """
+    List the PDF files of the area subdirectories of a directory, in processing order.
+    Raises:
+        NotADirectoryError: If the specified directory does not exist or is not a directory.
+    """
+    dir = Path(directory)
+
+    if not dir.exists() or not dir.is_dir():
+        raise NotADirectoryError(f"The directory {directory} does not exist or is not a directory.")
+
+    return [pdf_file for subdir in sorted(dir.iterdir()) if subdir.is_dir() for pdf_file in sorted(subdir.glob("*.pdf"))]
+
+def source_key(area: str, filename: str) -> str:
+    """Key of a source PDF in the near-duplicate index, e.g. 'biology/paper.pdf'."""
+    return f"{area}/{filename}"
+
+def iter_pdfs(directory: str="data/raw_articles/", duplicates: Optional[MinHashIndex] = None) -> Iterator[Dict[str, str]]:
+    """
+    Lazily process all PDF files in a directory and its subdirectories.
+    Yields each document as soon as it is extracted, so later stages (chunking) can
+    run while the next PDFs are parsed. See `process_pdfs` for the arguments.
+    Raises:
+        NotADirectoryError: If the specified directory does not exist or is not a directory.
+    """
+    area = None
+    for pdf_file in list_pdfs(directory):
+        if pdf_file.parent.name != area:
+            area = pdf_file.parent.name
+            logger.info(f"Processing area: {area}...")
+
+        with metrics.timer("ingestion.extract_seconds"):
+            pdf_data = load_and_clean_pdf(pdf_file)
+
+        # Add metadata
+        if pdf_data:
+            pdf_data['area'] = area
+            pdf_data['filename'] = pdf_file.name
+
+            if duplicates is not None:
+                key = source_key(area, pdf_file.name)
+                signature = duplicates.signature(pdf_data['text'])
+                if np.array_equal(duplicates.get(key), signature):
+                    logger.info(f"Skipping {key}: already indexed")
+                    continue
+
+                # A file is never a duplicate of its own earlier version
+                others = [match for match in duplicates.query(signature) if match[0] != key]
+                if others:
+                    logger.warning(f"Skipping {key}: near-duplicate of {others[0][0]} "
+                                   f"(similarity {others[0][1]:.2f})")
+                    continue
+                # A changed file replaces its old signature (and its chunks, see `BaseIndexer.create_collection`)
+                duplicates.remove([key])
+                duplicates.add(key, signature)
+
+            metrics.increment("ingestion.extract.documents")
+            yield pdf_data
+
+def process_pdfs(directory: str="data/raw_articles/", duplicates: Optional[MinHashIndex] = None) -> List[Dict[str, str]]:
     """
     Process all PDF files in a directory and its subdirectories.
     Recursively iterates through subdirectories, loads and cleans PDF files,
     and enriches them with metadata including the area (subdirectory name) and filename.
     Args:
         directory (str): Path to the directory containing subdirectories with PDF files.
+        duplicates (MinHashIndex, optional): Near-duplicate index of the documents already
+            ingested. PDFs matching another file in it (e.g. the same paper saved twice,
+            or filed under two areas) are skipped so they are not embedded twice, as are
+            unchanged files indexed by an earlier run; new and changed ones are added.
     Returns:
         list: A list of dictionaries containing processed PDF data with the following keys:
             - Existing keys from load_and_clean_pdf output
@@ -110,30 +177,7 @@ def process_pdfs(directory: str="data/raw_articles/") -> List[Dict[str, str]]:
     Raises:
         NotADirectoryError: If the specified directory does not exist or is not a directory.
     """
-
-    dir = Path(directory)
-
-    if not dir.exists() or not dir.is_dir():
-        raise NotADirectoryError(f"The directory {directory} does not exist or is not a directory.")
-    
-    # Iterate over all subdirectories
-    documents = []
-    for subdir in dir.iterdir():
-        if subdir.is_dir():
-            # Process PDFs in the subdirectory
-            logger.info(f"Processing area: {subdir.name}...")
-
-            for pdf_file in subdir.glob("*.pdf"):
-                pdf_data = load_and_clean_pdf(pdf_file)
-                
-                # Add metadata
-                if pdf_data:
-                    pdf_data['area'] = subdir.name
-                    pdf_data['filename'] = pdf_file.name
-                    
-                    documents.append(pdf_data)
-
-    return documents
+    return list(iter_pdfs(directory, duplicates=duplicates))
 
 if __name__ == "__main__":
     docs = process_pdfs()
@@ -0,0 +1,254 @@
+import json
+import os
+import numpy as np
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple
+from research_mcp_agent.ingestion.indexer import BaseIndexer, ChunkRecord, split_documents, flatten_results
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per matrix product, bounds the float32 copy of the int8 codes
+SCAN_BLOCK_ROWS = 16384
+
+
+class QuantizedIndexer(BaseIndexer):
+    def __init__(self, persist_directory: Path = Path(__file__).parent.parent / "vector_store" / "quantized",
+                 embedding_function: Optional[Any] = None, rerank_factor: int = 4, batch_size: int = 64) -> None:
+        """
+        Vector store keeping int8-quantised embeddings in memory-mapped files.
+
+        The corpus is scanned with the int8 codes (4x smaller than float32) and the
+        best `n_results * rerank_factor` candidates are re-ranked exactly with the
+        float32 vectors, of which only the candidate rows are paged in. All files are
+        opened read-only with `np.memmap`, so concurrent MCP server processes share
+        them through the OS page cache instead of each loading a private copy.
+
+        Files in `persist_directory`:
+            - manifest.json: Dimension, number of chunks and file format version.
+            - codes.npy / scales.npy: Per-vector symmetric int8 codes and their scales.
+            - vectors.npy: Normalized float32 embeddings used for exact re-ranking.
+            - chunks.jsonl / offsets.npy: Chunk records and their byte offsets.
+            - ids.npy / doc_ids.npy: Chunk and document IDs of every row, loaded
+              without decoding the chunk records.
+            - documents.json: Document table referenced by the chunks' doc_id.
+
+        Args:
+            persist_directory (Path): Directory path for persistent storage.
+            embedding_function: Callable embedding a list of texts. Defaults to ChromaDB's
+                default embedder, so results are comparable with `ChromaIndexer`.
+            rerank_factor (int): Candidate multiplier for the exact re-ranking stage.
+            batch_size (int): Number of texts embedded per call while indexing.
+        """
+        super().__init__(persist_directory)
+
+        self.embedding_function = embedding_function or DefaultEmbeddingFunction()
+        self.rerank_factor = rerank_factor
+        self.batch_size = batch_size
+        self.manifest_path = self.path_dir / "manifest.json"
+
+        self._load()
+        if self.count() == 0:
+            logger.info("The quantized index is empty. Run create_collection() to initialize it.")
+        else:
+            logger.info(f"Loaded quantized index with {self.count()} documents.")
+
+    def _load(self) -> None:
+        """Memory-map the index files, if any."""
+        self.ids: List[str] = []
+        self._row: Dict[str, int] = {}
+        self._doc_ids: List[Optional[str]] = []
+        self._rows_by_doc: Dict[Optional[str], np.ndarray] = {}
+
+        if not self.manifest_path.exists():
+            return
+
+        self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        if self.manifest["count"] == 0:
+            return
+
+        self.codes = np.load(self.path_dir / "codes.npy", mmap_mode="r")
+        self.scales = np.load(self.path_dir / "scales.npy", mmap_mode="r")
+        self.vectors = np.load(self.path_dir / "vectors.npy", mmap_mode="r")
+        self.offsets = np.load(self.path_dir / "offsets.npy", mmap_mode="r")
+        self.records = np.memmap(self.path_dir / "chunks.jsonl", dtype=np.uint8, mode="r")
+
+        if (self.path_dir / "ids.npy").exists():
+            self.ids = np.load(self.path_dir / "ids.npy").tolist()
+            self._doc_ids = [doc_id or None for doc_id in np.load(self.path_dir / "doc_ids.npy").tolist()]
+        else:
+            # Indexes written before the ID arrays existed
+            records = [self._record(i) for i in range(len(self.offsets) - 1)]
+            self.ids = [record["id"] for record in records]
+            self._doc_ids = [(record.get("metadata") or {}).get("doc_id") for record in records]
+        self._row = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+
+        # Rows of every document, so filtered queries only scan those rows
+        rows_by_doc: Dict[Optional[str], List[int]] = {}
+        for row, doc_id in enumerate(self._doc_ids):
+            rows_by_doc.setdefault(doc_id, []).append(row)
+        self._rows_by_doc = {doc_id: np.asarray(rows, dtype=np.int64) for doc_id, rows in rows_by_doc.items()}
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        """Decode one chunk record from the memory-mapped JSONL file."""
+        return json.loads(self.records[self.offsets[row]:self.offsets[row + 1]].tobytes())
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in batches and L2-normalize them."""
+        batches = [
+            np.asarray(self.embedding_function(texts[i:i + self.batch_size]), dtype=np.float32)
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        vectors = np.vstack(batches)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def create_collection(self, documents: Dict[str, Dict[str, str]], chunks: List[ChunkRecord]) -> None:
+        """
+        Add documents to the quantized index. Existing chunks are kept, except those
+        of the documents being added again (a changed PDF), which are replaced; the
+        files are rewritten atomically. Does nothing without chunks.
+
+        Args:
+            documents: Document table from `chunk_pdfs` (document ID -> fields)
+            chunks: Chunk records from `chunk_pdfs`
+        """
+        logger.info("Running create_collection()...")
+        if not chunks:
+            logger.info("No new documents to add.")
+            return
+
+        replaced = set(documents) & set(self.documents)
+        if replaced:
+            logger.info(f"Replacing the chunks of {len(replaced)} changed documents.")
+        kept = [row for row, doc_id in enumerate(self._doc_ids) if doc_id not in replaced]
+
+        self.add_documents(documents)
+        ids, texts, metadatas = split_documents(chunks)
+
+        records = [self._record(row) for row in kept]
+        records += [{"id": chunk_id, "text": text, "metadata": metadata}
+                    for chunk_id, text, metadata in zip(ids, texts, metadatas)]
+
+        vectors = self._embed(texts)
+        if kept:
+            vectors = np.vstack([np.asarray(self.vectors)[kept], vectors])
+
+        self._write(records, vectors)
+        self._load()
+        logger.info(f"Added {len(chunks)} documents. Total in collection: {self.count()}")
+
+    def _write(self, records: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Write every index file next to its final name, then swap them in."""
+        if not records:
+            # An empty index is only a manifest
+            manifest = {"version": 2, "quantization": "int8", "count": 0, "dim": 0}
+            (self.path_dir / "manifest.json.tmp").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            os.replace(self.path_dir / "manifest.json.tmp", self.manifest_path)
+            return
+
+        # Symmetric per-vector quantization: code = round(v / scale), scale = max|v| / 127
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+
+        lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records]
+        offsets = np.r_[0, np.cumsum([len(line) for line in lines])].astype(np.int64)
+
+        doc_ids = [(record.get("metadata") or {}).get("doc_id") or "" for record in records]
+        arrays = {"codes.npy": codes, "scales.npy": scales.astype(np.float32),
+                  "vectors.npy": vectors.astype(np.float32), "offsets.npy": offsets,
+                  "ids.npy": np.array([record["id"] for record in records], dtype=str),
+                  "doc_ids.npy": np.array(doc_ids, dtype=str)}
+        for name, array in arrays.items():
+            with open(self.path_dir / f"{name}.tmp", "wb") as f:
+                np.save(f, array)
+        (self.path_dir / "chunks.jsonl.tmp").write_bytes(b"".join(lines))
+
+        manifest = {"version": 2, "quantization": "int8", "count": len(records), "dim": int(vectors.shape[1])}
+        (self.path_dir / "manifest.json.tmp").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        # The manifest goes last: readers only see a complete set of files
+        for name in [*arrays, "chunks.jsonl", "manifest.json"]:
+            os.replace(self.path_dir / f"{name}.tmp", self.path_dir / name)
+
+    def write_embedded(self, documents: Dict[str, Dict[str, Any]], records: List[Dict[str, Any]],
+                       vectors: Optional[np.ndarray]) -> None:
+        """
+        Replace the index content with chunks embedded elsewhere (see `BaseIndexer.export`),
+        without calling the embedding function.
+
+        Args:
+            documents: Document table (document ID -> fields).
+            records: Chunk records with 'id', 'text' and 'metadata'.
+            vectors: One embedding per record, normalized here.
+        """
+        self.add_documents(documents)
+        if vectors is None or not len(records):
+            vectors = np.empty((0, 0), dtype=np.float32)
+        else:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+
+        self._write(records, vectors)
+        self._load()
+
+    def export(self) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]], Optional[np.ndarray]]:
+        if self.count() == 0:
+            return dict(self.documents), [], None
+        return dict(self.documents), [self._record(i) for i in range(self.count())], np.asarray(self.vectors)
+
+    def all_chunks(self) -> Tuple[List[str], List[str], List[Optional[str]]]:
+        return list(self.ids), [self._record(i)["text"] for i in range(self.count())], list(self._doc_ids)
+
+    def get(self, ids: List[str]) -> Dict[str, Any]:
+        records = [self._record(self._row[chunk_id]) for chunk_id in ids if chunk_id in self._row]
+
+        return self.join_documents(flatten_results(
+            ids=[record["id"] for record in records],
+            documents=[record["text"] for record in records],
+            metadatas=[record["metadata"] for record in records],
+        ))
+
+    def dense_query(self, query_texts: List[str], n_results: int,
+                    doc_ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        rows = None
+        if doc_ids is not None:
+            selected = [self._rows_by_doc[doc_id] for doc_id in doc_ids if doc_id in self._rows_by_doc]
+            rows = np.sort(np.concatenate(selected)) if selected else np.array([], dtype=np.int64)
+
+        n_rows = self.count() if rows is None else len(rows)
+        if n_rows == 0:
+            return {'ids': [], 'documents': [], 'distances': []}
+
+        query = self._embed(query_texts[:1])[0]
+        n_results = min(n_results, n_rows)
+        n_candidates = min(n_rows, n_results * self.rerank_factor)
+
+        # Approximate scan over the int8 codes (only the selected rows), block by block
+        approx = np.empty(n_rows, dtype=np.float32)
+        for start in range(0, n_rows, SCAN_BLOCK_ROWS):
+            end = min(start + SCAN_BLOCK_ROWS, n_rows)
+            block = slice(start, end) if rows is None else rows[start:end]
+            approx[start:end] = (self.codes[block] @ query) * self.scales[block]
+
+        candidates = np.sort(np.argpartition(-approx, n_candidates - 1)[:n_candidates])
+        if rows is not None:
+            candidates = rows[candidates]
+
+        # Exact re-ranking, only the candidate rows of the float32 vectors are read
+        similarity = self.vectors[candidates] @ query
+        best = np.argsort(-similarity, kind="stable")[:n_results]
+        rows = candidates[best]
+
+        output = self.get([self.ids[row] for row in rows])
+        # Squared L2 distance between unit vectors, as reported by ChromaDB
+        output['distances'] = (2.0 - 2.0 * similarity[best]).tolist()
+
+        return output
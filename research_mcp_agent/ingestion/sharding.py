@@ -0,0 +1,293 @@
+import re
+import shutil
+import zlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from research_mcp_agent.ingestion.indexer import BaseIndexer, ChunkRecord
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Separates the shard name from the chunk ID, e.g. "biology:id42"
+SHARD_SEPARATOR = ":"
+
+
+def shard_name(doc: Dict[str, Any], shard_by: str, n_shards: int = 4) -> str:
+    """
+    Compute the shard a document (and all its chunks) belongs to.
+
+    Args:
+        doc (Dict[str, Any]): The document fields, from the document table.
+        shard_by (str): 'area' to shard by research area, or 'hash' to spread the
+            source files evenly over n_shards shards.
+        n_shards (int): Number of shards used by the 'hash' strategy.
+
+    Returns:
+        str: A directory-safe shard name.
+    """
+    if shard_by == "area":
+        name = str(doc.get('area') or "unknown")
+    elif shard_by == "hash":
+        # Hash the source file so that all chunks of an article share a shard
+        key = str(doc.get('filename'))
+        name = f"shard{zlib.crc32(key.encode('utf-8')) % n_shards}"
+    else:
+        raise ValueError(f"Unknown sharding strategy: {shard_by}")
+
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def _rows(result: Dict[str, Any], keys: set) -> List[Dict[str, Any]]:
+    """Turn flattened query results into one dictionary per hit."""
+    n_hits = len(result.get('ids', []))
+    columns = {key: result.get(key) or [None] * n_hits for key in keys}
+    return [{key: columns[key][i] for key in keys} for i in range(n_hits)]
+
+
+def merge_results(results: List[Dict[str, Any]], n_results: int) -> Dict[str, Any]:
+    """
+    Merge flattened dense results from several shards into one top-k ranking.
+
+    Distances are comparable across shards since every shard uses the same
+    embedder. Rank-based scores (BM25 fused with RRF) are not, which is why hybrid
+    search fuses the merged dense and lexical lists once, see `ShardedIndexer`.
+
+    Args:
+        results (List[Dict[str, Any]]): Outputs of `BaseIndexer.dense_query`.
+        n_results (int): Number of hits to keep.
+
+    Returns:
+        Dict[str, Any]: The n_results closest hits, flattened like `BaseIndexer.query`.
+    """
+    keys = set().union(*(result.keys() for result in results)) if results else {'ids', 'documents', 'distances'}
+
+    hits = [hit for result in results for hit in _rows(result, keys)]
+
+    hits.sort(key=lambda hit: hit['distances'])
+    hits = hits[:n_results]
+
+    return {key: [hit[key] for hit in hits] for key in keys}
+
+
+def merge_rankings(rankings: List[Tuple[List[str], List[float]]], n_results: int) -> Tuple[List[str], List[float]]:
+    """
+    Merge the BM25 rankings (chunk IDs and scores, best first) of several shards
+    into one top-k ranking by score.
+    """
+    hits = sorted(((score, chunk_id) for ids, scores in rankings for chunk_id, score in zip(ids, scores)),
+                  key=lambda hit: hit[0], reverse=True)[:n_results]
+    return [chunk_id for _, chunk_id in hits], [score for score, _ in hits]
+
+
+class ShardedIndexer(BaseIndexer):
+    def __init__(self, persist_directory: Path, shard_by: str, make_shard: Callable[[Path], BaseIndexer],
+                 reset: Iterable[str] = ()) -> None:
+        """
+        Vector store split into independent shards, one sub-directory each.
+
+        Every shard is a complete store of its own (vectors and BM25 side index), so a
+        single shard can be rebuilt without touching the others. Queries fan out to
+        all shards concurrently, or go to a single shard when it is known which one
+        holds the answer. The dense and BM25 top-k lists of the shards are merged
+        into global lists first, and hybrid search fuses these once, as an unsharded
+        store would: per-shard RRF scores only reflect ranks within their shard.
+        Filters are resolved against the union of the shards' document tables.
+
+        Args:
+            persist_directory (Path): Directory containing one sub-directory per shard.
+            shard_by (str): 'area' or 'hash', see `shard_name`.
+            make_shard (Callable[[Path], BaseIndexer]): Opens the backend of one shard.
+            reset (Iterable[str]): Names of the shards to delete from disk, leaving the
+                others untouched. This happens before any shard is opened: ChromaDB caches
+                its database per path, so a client still open on the deleted files
+                cannot write to the re-created shard (see `close`).
+        """
+        super().__init__(persist_directory)
+        self.shard_by = shard_by
+        self.make_shard = make_shard
+
+        for name in reset:
+            shutil.rmtree(self.path_dir / name, ignore_errors=True)
+
+        self.shards: Dict[str, BaseIndexer] = {
+            path.name: make_shard(path) for path in sorted(self.path_dir.iterdir()) if path.is_dir()
+        }
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.shards), 1), thread_name_prefix="shard")
+        self._merge_documents()
+        logger.info(f"Loaded {len(self.shards)} shards: {list(self.shards)}")
+
+    def _merge_documents(self) -> None:
+        """Rebuild the document table (and its lookups) from the tables of the shards."""
+        self.documents = {}
+        self._shard_of: Dict[str, str] = {}
+        for name, shard in self.shards.items():
+            self.documents.update(shard.documents)
+            self._shard_of.update(dict.fromkeys(shard.documents, name))
+        self._index_documents()
+
+    def shard(self, name: str) -> BaseIndexer:
+        """Return the shard with the given name, opening it if it does not exist yet."""
+        if name not in self.shards:
+            self.shards[name] = self.make_shard(self.path_dir / name)
+        return self.shards[name]
+
+    def route(self, documents: Dict[str, Dict[str, str]], chunks: List[ChunkRecord],
+              n_shards: int = 4) -> Dict[str, Tuple[Dict[str, Dict[str, str]], List[ChunkRecord]]]:
+        """
+        Group documents and chunks by shard and prefix the chunk IDs with the shard
+        name, so that IDs stay unique across shards that are indexed at different times.
+
+        Returns:
+            Dict[str, Tuple[Dict[str, Dict[str, str]], List[ChunkRecord]]]: The document
+                table and the chunks of each shard.
+        """
+        shard_of = {doc_id: shard_name(doc, self.shard_by, n_shards) for doc_id, doc in documents.items()}
+
+        routed: Dict[str, Tuple[Dict[str, Dict[str, str]], List[ChunkRecord]]] = {}
+        for doc_id, name in shard_of.items():
+            routed.setdefault(name, ({}, []))[0][doc_id] = documents[doc_id]
+
+        for chunk in chunks:
+            name = shard_of[chunk.doc_id]
+            routed[name][1].append(ChunkRecord(
+                index=f"{name}{SHARD_SEPARATOR}{chunk.index}",
+                doc_id=chunk.doc_id,
+                position=chunk.position,
+                start=chunk.start,
+                end=chunk.end,
+                text=chunk.text,
+            ))
+
+        return routed
+
+    def create_collection(self, documents: Dict[str, Dict[str, str]], chunks: List[ChunkRecord],
+                          n_shards: int = 4) -> None:
+        """
+        Add documents to their shards.
+
+        Args:
+            documents: Document table from `chunk_pdfs` (document ID -> fields)
+            chunks: Chunk records from `chunk_pdfs`
+            n_shards (int): Number of shards used by the 'hash' strategy.
+        """
+        for name, (shard_documents, shard_chunks) in self.route(documents, chunks, n_shards).items():
+            logger.info(f"Indexing {len(shard_chunks)} documents into shard '{name}'")
+            self.shard(name).create_collection(shard_documents, shard_chunks)
+        self._merge_documents()
+
+    def close(self) -> None:
+        for shard in self.shards.values():
+            shard.close()
+        self.executor.shutdown()
+
+    def build_lexical_index(self) -> None:
+        for shard in self.shards.values():
+            shard.build_lexical_index()
+
+    def all_chunks(self) -> Tuple[List[str], List[str], List[Optional[str]]]:
+        ids, texts, doc_ids = [], [], []
+        for shard in self.shards.values():
+            shard_ids, shard_texts, shard_doc_ids = shard.all_chunks()
+            ids += shard_ids
+            texts += shard_texts
+            doc_ids += shard_doc_ids
+        return ids, texts, doc_ids
+
+    def export(self) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]], Optional[np.ndarray]]:
+        documents, records, vectors = {}, [], []
+        for shard in self.shards.values():
+            shard_documents, shard_records, shard_vectors = shard.export()
+            documents.update(shard_documents)
+            records += shard_records
+            if shard_vectors is not None:
+                vectors.append(shard_vectors)
+        return documents, records, np.vstack(vectors) if vectors else None
+
+    def get(self, ids: List[str]) -> Dict[str, Any]:
+        by_shard: Dict[str, List[str]] = {}
+        for chunk_id in ids:
+            name = chunk_id.split(SHARD_SEPARATOR, 1)[0]
+            if name in self.shards:
+                by_shard.setdefault(name, []).append(chunk_id)
+
+        futures = [self.executor.submit(self.shards[name].get, shard_ids) for name, shard_ids in by_shard.items()]
+        found = [future.result() for future in futures]
+
+        # Restore the requested order
+        keys = set().union(*(result.keys() for result in found)) if found else {'ids', 'documents'}
+        rows = {row['ids']: row for result in found for row in _rows(result, keys)}
+        ordered = [rows[chunk_id] for chunk_id in ids if chunk_id in rows]
+
+        return {key: [row[key] for row in ordered] for key in keys}
+
+    def _fan_out(self, search: Callable[..., Any], doc_ids: Optional[Set[str]]) -> List[Any]:
+        """
+        Run search(shard, shard_doc_ids) on every shard concurrently, skipping the
+        shards that hold none of doc_ids (None searches every shard).
+        """
+        if doc_ids is None:
+            targets = [(shard, None) for shard in self.shards.values()]
+        else:
+            by_shard: Dict[str, Set[str]] = {}
+            for doc_id in doc_ids:
+                if doc_id in self._shard_of:
+                    by_shard.setdefault(self._shard_of[doc_id], set()).add(doc_id)
+            targets = [(self.shards[name], shard_doc_ids) for name, shard_doc_ids in by_shard.items()]
+
+        futures = [self.executor.submit(search, shard, shard_doc_ids) for shard, shard_doc_ids in targets]
+        return [future.result() for future in futures]
+
+    def dense_query(self, query_texts: List[str], n_results: int,
+                    doc_ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+        results = self._fan_out(lambda shard, ids: shard.dense_query(query_texts, n_results, doc_ids=ids), doc_ids)
+        return merge_results(results, n_results)
+
+    def lexical_query(self, query_text: str, n_results: int, doc_ids: Optional[Set[str]] = None,
+                      exclude: Optional[Set[str]] = None) -> Optional[Tuple[List[str], List[float]]]:
+        results = self._fan_out(
+            lambda shard, ids: shard.lexical_query(query_text, n_results, doc_ids=ids, exclude=exclude), doc_ids
+        )
+
+        rankings = [ranking for ranking in results if ranking is not None]
+        if not rankings:
+            return None
+        if len(rankings) < len(results):
+            logger.warning(f"{len(results) - len(rankings)} shards have no BM25 index, "
+                           f"their chunks are only found by dense search.")
+
+        return merge_rankings(rankings, n_results)
+
+    def query(self, query_texts: List[str], n_results: int = 1, mode: str = "dense",
+              area: Optional[str] = None, filename: Optional[str] = None, keyword: Optional[str] = None,
+              shard: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Query every shard concurrently and merge their top-k hits.
+
+        Args:
+            query_texts (List[str]): A list of query strings to search for in the collection.
+            n_results (int, optional): The number of results to return. Defaults to 1.
+            mode (str, optional): 'dense', 'lexical' or 'hybrid', see `BaseIndexer.query`.
+            area (str, optional): Only search chunks from this area. When sharded by
+                area, only that area's shard is queried.
+            filename (str, optional): Only search chunks from this file.
+            keyword (str, optional): Only search documents whose title or keywords
+                contain all these terms.
+            shard (str, optional): Only query this shard.
+
+        Returns:
+            Dict[str, Any]: The merged query results.
+        """
+        if area and area.strip() and self.shard_by == "area":
+            shard = shard_name({'area': area.strip()}, "area")
+
+        if shard is not None:
+            if shard in self.shards:
+                return self.shards[shard].query(query_texts, n_results=n_results, mode=mode, area=area,
+                                                filename=filename, keyword=keyword)
+            logger.warning(f"Unknown shard '{shard}', querying every shard instead.")
+
+        return super().query(query_texts, n_results=n_results, mode=mode, area=area,
+                             filename=filename, keyword=keyword)
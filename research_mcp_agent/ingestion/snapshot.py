@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from research_mcp_agent.ingestion.indexer import BaseIndexer
+from research_mcp_agent.ingestion.quantized import QuantizedIndexer
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Layout version of a snapshot directory, recorded in its snapshot.json
+SNAPSHOT_FORMAT = 1
+
+# File naming the active snapshot directory, switched atomically
+CURRENT_POINTER = "CURRENT"
+
+# Seconds between two checks of CURRENT by a serving process
+RELOAD_INTERVAL = float(os.getenv("SNAPSHOT_RELOAD_INTERVAL", 5))
+
+
+def current_snapshot(root: Path) -> Optional[Path]:
+    """
+    Resolve the active snapshot.
+
+    Args:
+        root (Path): Directory holding the snapshot versions and CURRENT.
+
+    Returns:
+        Optional[Path]: The snapshot directory named by CURRENT, None if there is none.
+    """
+    pointer = Path(root) / CURRENT_POINTER
+    if not pointer.exists():
+        return None
+
+    path = Path(root) / pointer.read_text(encoding="utf-8").strip()
+    return path if (path / "snapshot.json").exists() else None
+
+
+def _next_version(root: Path) -> int:
+    versions = [int(path.name[1:]) for path in root.glob("v[0-9]*") if path.name[1:].isdigit()]
+    return max(versions, default=0) + 1
+
+
+def write_snapshot(source: BaseIndexer, root: Path, backend: str = "chroma", keep: int = 2) -> Optional[Path]:
+    """
+    Export a vector store as a new read-only snapshot version and make it current.
+
+    The snapshot uses the memory-mapped layout of `QuantizedIndexer` (int8 codes,
+    float32 vectors, chunk records and ID arrays as .npy/.jsonl files) plus the
+    document table, the BM25 side index and a `snapshot.json` manifest. The stored
+    embeddings are copied, so nothing is embedded again. The version is built in a
+    staging directory, renamed into place, and only then is `CURRENT` replaced with
+    `os.replace`: readers switch from one complete version to the next, and never
+    see a half-written one.
+
+    Args:
+        source (BaseIndexer): The store to export (any backend, sharded or not).
+        root (Path): Directory holding the snapshot versions (e.g. `vector_store/snapshots/`).
+        backend (str): Backend of the source store, recorded in the manifest.
+        keep (int): Number of versions kept on disk, including the new one. Older
+            versions are deleted; processes still reading them keep their mapped files.
+
+    Returns:
+        Optional[Path]: The directory of the new snapshot, None when the store is
+            empty (nothing is published and CURRENT is left as it is).
+    """
+    start = time.perf_counter()
+    documents, records, vectors = source.export()
+    if not records:
+        logger.warning("The vector store is empty, no snapshot published.")
+        return None
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    name = f"v{_next_version(root):06d}"
+    staging = root / f".{name}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    snapshot = QuantizedIndexer(persist_directory=staging,
+                                embedding_function=getattr(source, "embedding_function", None))
+    snapshot.write_embedded(documents, records, vectors)
+    snapshot.build_lexical_index()
+
+    manifest: Dict[str, Any] = {
+        "format": SNAPSHOT_FORMAT,
+        "version": name,
+        "created_at": time.time(),
+        "source_backend": backend,
+        "count": len(records),
+        "dim": int(vectors.shape[1]) if vectors is not None else 0,
+        "documents": len(documents),
+    }
+    (staging / "snapshot.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    # Snapshots are immutable once published
+    for path in staging.iterdir():
+        path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    target = root / name
+    os.replace(staging, target)
+
+    pointer_tmp = root / f"{CURRENT_POINTER}.tmp"
+    pointer_tmp.write_text(name, encoding="utf-8")
+    os.replace(pointer_tmp, root / CURRENT_POINTER)
+
+    logger.info(f"Published snapshot {name} ({len(records)} chunks) in {time.perf_counter() - start:.2f}s")
+    prune_snapshots(root, keep=keep)
+    return target
+
+
+def prune_snapshots(root: Path, keep: int = 2) -> List[Path]:
+    """
+    Delete all but the `keep` newest snapshot versions (the current one is never deleted).
+
+    Returns:
+        List[Path]: The deleted directories.
+    """
+    current = current_snapshot(root)
+    versions = sorted((path for path in Path(root).glob("v[0-9]*") if path.is_dir()), key=lambda path: path.name)
+
+    deleted = []
+    for path in versions[:-keep] if keep > 0 else versions:
+        if path != current:
+            shutil.rmtree(path, ignore_errors=True)
+            deleted.append(path)
+
+    return deleted
+
+
+class SnapshotIndexer:
+    def __init__(self, root: Path, reload_interval: float = RELOAD_INTERVAL) -> None:
+        """
+        Read-only store serving the current snapshot, following `CURRENT`.
+
+        Opening a snapshot only memory-maps its files, so it is ready almost at once,
+        and every process serving it shares the pages through the OS page cache. At
+        most every `reload_interval` seconds the pointer is checked again; when a
+        re-index has published a new version, it is opened and swapped in. Queries
+        already running finish on the version they started with.
+
+        Exposes the query interface of `BaseIndexer` (`query`, `get`, `all_chunks`,
+        ...) by delegating to the snapshot currently open.
+
+        Args:
+            root (Path): Directory holding the snapshot versions and CURRENT.
+            reload_interval (float): Seconds between two checks of CURRENT.
+        """
+        self.root = Path(root)
+        self.reload_interval = reload_interval
+
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._path: Optional[Path] = None
+        self._index: Optional[QuantizedIndexer] = None
+        self.current()
+
+    def current(self) -> QuantizedIndexer:
+        """Return the open snapshot, switching to a newer version if one was published."""
+        with self._lock:
+            now = time.monotonic()
+            if self._index is not None and now - self._checked_at < self.reload_interval:
+                return self._index
+
+            self._checked_at = now
+            path = current_snapshot(self.root)
+            if path is None:
+                if self._index is None:
+                    raise FileNotFoundError(f"No snapshot found in {self.root}")
+                return self._index
+
+            if path != self._path:
+                start = time.perf_counter()
+                # Keep the loaded embedding model across versions
+                embedding_function = self._index.embedding_function if self._index is not None else None
+                self._index = QuantizedIndexer(persist_directory=path, embedding_function=embedding_function)
+                self._path = path
+                logger.info(f"Serving snapshot {path.name} (opened in {time.perf_counter() - start:.3f}s)")
+
+            return self._index
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._path.name if self._path is not None else None
+
+    def query(self, query_texts: List[str], n_results: int = 1, mode: str = "dense",
+              area: Optional[str] = None, filename: Optional[str] = None,
+              keyword: Optional[str] = None) -> Dict[str, Any]:
+        return self.current().query(query_texts, n_results=n_results, mode=mode, area=area,
+                                    filename=filename, keyword=keyword)
+
+    def get(self, ids: List[str]) -> Dict[str, Any]:
+        return self.current().get(ids)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.current(), name)
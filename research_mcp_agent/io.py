@@ -4,6 +4,7 @@ import logging
 from pathlib import Path
 from pypdf import PdfReader
 from tempfile import TemporaryDirectory
+from typing import List
 
 logger = logging.getLogger(__name__)
 
@@ -142,6 +143,62 @@ def read_file_content(file_path: str) -> str:
     else:
         return _read_text_file(path)
 
+# Files written by save_outputs, never treated as inputs
+OUTPUT_SUFFIXES = ("_full.json", "_extraction.json", "_review.md")
+
+
+def list_input_files(input_dir: str) -> List[str]:
+    """
+    List the articles of a batch directory, in a stable order.
+
+    Args:
+        input_dir: Directory containing .pdf, .url, .txt or .md files
+        
+    Returns:
+        Sorted file paths, excluding the artifacts produced by previous runs
+    """
+    path = Path(input_dir)
+    if not path.is_dir():
+        raise NotADirectoryError(f"The directory {input_dir} does not exist or is not a directory.")
+
+    return sorted(
+        str(file) for file in path.iterdir()
+        if file.is_file()
+        and file.suffix.lower() in (".pdf", ".url", ".txt", ".md")
+        and not file.name.endswith(OUTPUT_SUFFIXES)
+    )
+
+def _output_path(base_filename: str, suffix: str) -> Path:
+    """Path of one artifact, next to the input file: <stem><suffix>."""
+    output_dir = Path(base_filename).parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    return output_dir / f"{Path(base_filename).stem}{suffix}"
+
+def save_extraction(base_filename: str, extraction: dict) -> Path:
+    """Save extraction.json (Just the extraction part)."""
+    extraction_path = _output_path(base_filename, "_extraction.json")
+    with open(extraction_path, "w", encoding="utf-8") as f:
+        json.dump(extraction, f, indent=2, ensure_ascii=False)
+
+    return extraction_path
+
+def save_review(base_filename: str, review_markdown: str) -> Path:
+    """Save review.md (Just the markdown part)."""
+    review_path = _output_path(base_filename, "_review.md")
+    with open(review_path, "w", encoding="utf-8") as f:
+        f.write(review_markdown)
+
+    return review_path
+
+def save_full(base_filename: str, result: dict) -> Path:
+    """Save full_output.json (The combined template)."""
+    full_path = _output_path(base_filename, "_full.json")
+    with open(full_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    return full_path
+
 def save_outputs(base_filename: str, result: dict):
     """
     Saves the specific artifacts required by the challenge deliverables.
@@ -149,27 +206,15 @@ def save_outputs(base_filename: str, result: dict):
     2. extraction.json (Just the extraction part)
     3. review.md (Just the markdown part)
     """
-    output_dir = Path(base_filename).parent 
-    output_dir.mkdir(exist_ok=True)
-    
-    base_name = Path(base_filename).stem
-    
     # 1. Save Full Agent Output (The "Template de Saída")
-    full_path = output_dir / f"{base_name}_full.json"
-    with open(full_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
-    
+    full_path = save_full(base_filename, result)
+
     # 2. Save Extraction Only (deliverable requirement)
-    extraction_path = output_dir / f"{base_name}_extraction.json"
-    with open(extraction_path, "w", encoding="utf-8") as f:
-        json.dump(result["extraction"], f, indent=2, ensure_ascii=False)
+    save_extraction(base_filename, result["extraction"])
 
     # 3. Save Review Markdown (deliverable requirement)
-    review_path = output_dir / f"{base_name}_review.md"
-    with open(review_path, "w", encoding="utf-8") as f:
-        f.write(result["review_markdown"])
+    review_path = save_review(base_filename, result["review_markdown"])
 
-    logger.info(f"Artifacts saved to {output_dir}/")
+    logger.info(f"Artifacts saved to {full_path.parent}/")
     logger.info(f"   - {full_path}")
     logger.info(f"   - {review_path}")
-
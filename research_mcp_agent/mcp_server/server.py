@@ -1,22 +1,29 @@
 from fastmcp import FastMCP
-from typing import List, Dict, Any
-from research_mcp_agent.ingestion.indexer import ChromaIndexer
+from typing import List, Dict, Any, Optional
+from research_mcp_agent.ingestion.indexer import open_indexer, query_articles
 from pathlib import Path
 
 # Initialize the FastMCP Server
 mcp = FastMCP("Scientific Article Server")
 
-# Database connection 
+# Database connection (backend chosen by the last `create` run)
 path_db = Path(__file__).parent.parent
-db_client = ChromaIndexer(persist_directory=path_db / "vector_store")
+db_client = open_indexer(persist_directory=path_db / "vector_store")
+
+# Overlapping chunks of one PDF crowd the ranking, so fetch more chunks than
+# requested and collapse them into distinct articles (doubled while too few).
+OVERFETCH_FACTOR = 5
 
 # --- TOOLS ---
 
 @mcp.tool()
-def search_articles(query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+def search_articles(query: str, n_results: int = 3, mode: str = "hybrid",
+                    area: Optional[str] = None, filename: Optional[str] = None,
+                    keyword: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     CRITICAL FOR CLASSIFICATION. 
     Use this tool to find the most semantically similar articles in the database.
+    Every result is a DISTINCT article, so each one counts as one vote.
 
     HOW TO USE FOR CLASSIFICATION:
     1. Pass relevant information or summary of the input article as the 'query'.
@@ -25,34 +32,41 @@ def search_articles(query: str, n_results: int = 3) -> List[Dict[str, Any]]:
 
     Args:
         query: The text content or summary of the article you are analyzing. (e.g., "optimization in solar energy...").
-        n_results: The number of top matches to return (default: 3).
+        n_results: The number of distinct articles to return (default: 3).
+        mode: 'hybrid' (default) combines keyword matching, which catches domain jargon and
+            acronyms, with semantic similarity. Use 'dense' for semantic similarity only or
+            'lexical' for keyword matching only.
+        area: Optional. Only search articles of this area, e.g. to confirm a candidate
+            classification. Leave empty when classifying.
+        filename: Optional. Only search the article with this file name (e.g. 'biology_01.pdf').
+        keyword: Optional. Only search articles whose title or keywords contain all these
+            words (e.g. 'reinforcement learning').
 
     Returns:
-        A list with n_results of elements, where each element is a dictionary contains:
-        - id: The unique article ID (needed for get_article_content).
+        A list with n_results elements (fewer only if fewer articles match), one per article,
+        where each element is a dictionary contains:
+        - id: The ID of the best-matching chunk (needed for get_article_content).
         - title: The title of the paper.
         - area: The scientific field/area.
-        - score: A similarity score (lower is better).
+        - filename: The source file of the paper.
+        - score: The best score among the article's chunks (lower is better in 'dense'
+          mode, higher is better in 'hybrid' and 'lexical' modes).
+        - mean_score: The average score of the article's matching chunks.
+        - hits: How many of the article's chunks matched the query.
+        - snippet: The beginning of the best-matching chunk.
     """
-    results = db_client.collection.query(
-        query_texts=[query],
-        n_results=n_results,
-        include=["metadatas", "distances"] 
+    # Chunk hits grouped by article for the Agent
+    return query_articles(
+        db_client,
+        query,
+        n_articles=n_results,
+        overfetch_factor=OVERFETCH_FACTOR,
+        mode=mode,
+        area=area,
+        filename=filename,
+        keyword=keyword,
     )
 
-    # Flatten the ChromaDB result structure for the Agent
-    output = []
-    if results['ids']:
-        for i in range(len(results['ids'][0])):
-            output.append({
-                "id": results['ids'][0][i],
-                "title": results['metadatas'][0][i].get("title", "Unknown"),
-                "area": results['metadatas'][0][i].get("area", "Unknown"),
-                "score": results['distances'][0][i] 
-            })
-    
-    return output
-
 
 @mcp.tool()
 def get_article_content(article_id: str) -> Dict[str, Any]:
@@ -80,18 +94,15 @@ def get_article_content(article_id: str) -> Dict[str, Any]:
             - content (str): The full text content of the article.
             - error (str, optional): Included if the ID was not found.
     """
-    result = db_client.collection.get(
-        ids=[article_id],
-        include=["documents", "metadatas"]
-    )
+    result = db_client.get(ids=[article_id])
 
     if not result['ids']:
         return {"error": f"Article with ID {article_id} not found."}
 
     return {
         "id": result['ids'][0],
-        "title": result['metadatas'][0].get("title", "Unknown"),
-        "area": result['metadatas'][0].get("area", "Unknown"),
+        "title": (result.get('title') or [None])[0] or "Unknown",
+        "area": (result.get('area') or [None])[0] or "Unknown",
         "content": result['documents'][0] # The full chunk text
     }
 
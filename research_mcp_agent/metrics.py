@@ -0,0 +1,79 @@
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    def __init__(self) -> None:
+        """
+        Minimal in-process metrics registry.
+
+        Counters accumulate values (e.g. retries, cache hits) and observations keep
+        every sample (e.g. latencies in seconds) so percentiles can be reported.
+        All methods are thread-safe.
+        """
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.observations: Dict[str, List[float]] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add value to the counter `name`."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample of the observation `name`."""
+        with self._lock:
+            self.observations.setdefault(name, []).append(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the collected metrics.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Counters as {'value': x}, observations as
+                {'count', 'total', 'mean', 'p50', 'p95'}.
+        """
+        with self._lock:
+            summary = {name: {"value": value} for name, value in self.counters.items()}
+            for name, samples in self.observations.items():
+                values = np.asarray(samples, dtype=np.float64)
+                summary[name] = {
+                    "count": len(values),
+                    "total": float(values.sum()),
+                    "mean": float(values.mean()),
+                    "p50": float(np.percentile(values, 50)),
+                    "p95": float(np.percentile(values, 95)),
+                }
+
+        return summary
+
+    def reset(self) -> None:
+        """Drop every counter and observation."""
+        with self._lock:
+            self.counters.clear()
+            self.observations.clear()
+
+    def log(self) -> None:
+        """Log the current snapshot, one line per metric."""
+        for name, values in sorted(self.snapshot().items()):
+            logger.info(f"{name}: " + ", ".join(f"{key}={value:.4g}" for key, value in values.items()))
+
+
+# Process-wide registry shared by the agent and ingestion modules
+metrics = Metrics()
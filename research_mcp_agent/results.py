@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from research_mcp_agent.io import save_outputs
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = "segment-*.jsonl"
+
+
+class JsonlResultSink:
+    def __init__(self, output_dir: str = "results/", batch_size: int = 50) -> None:
+        """
+        Buffered, crash-safe output sink for batch runs.
+
+        Instead of three pretty-printed files per article, results are buffered in
+        memory and committed `batch_size` at a time as one compact JSONL segment
+        (`segment-000001.jsonl`, ...). A segment is written to a temporary file,
+        fsynced, then renamed into place with `os.replace`, so a crash never leaves a
+        partial segment: readers only ever see whole commits. Use `export_results` to
+        regenerate the per-article files.
+
+        Args:
+            output_dir (str): Directory holding the segments.
+            batch_size (int): Number of results per commit.
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self._buffer: List[dict] = []
+
+        existing = sorted(self.output_dir.glob(SEGMENT_PATTERN))
+        self._next_segment = int(existing[-1].stem.split("-")[1]) + 1 if existing else 1
+
+    def add(self, file_path: str, result: dict) -> None:
+        """
+        Buffer the output of one article, committing when the batch is full.
+
+        Has the same signature as `save_outputs`, so it can be passed as the
+        `on_result` callback of batch runs.
+
+        Args:
+            file_path (str): The input file of the article.
+            result (dict): The agent output (area, extraction, review_markdown).
+        """
+        self._buffer.append({"source": str(file_path), "written_at": time.time(), **result})
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> Optional[Path]:
+        """
+        Atomically commit the buffered results as a new segment.
+
+        Returns:
+            Optional[Path]: The segment written, None if the buffer was empty.
+        """
+        if not self._buffer:
+            return None
+
+        segment = self.output_dir / f"segment-{self._next_segment:06d}.jsonl"
+        tmp_path = segment.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self._buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, segment)
+
+        logger.info(f"Committed {len(self._buffer)} results to {segment}")
+        self._buffer.clear()
+        self._next_segment += 1
+        return segment
+
+    def __enter__(self) -> "JsonlResultSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+
+def read_results(output_dir: str = "results/") -> Dict[str, dict]:
+    """
+    Load the results committed by a `JsonlResultSink`.
+
+    Args:
+        output_dir (str): Directory holding the segments.
+
+    Returns:
+        Dict[str, dict]: Records by source file; when an article was processed
+            several times, the most recent commit wins.
+    """
+    records: Dict[str, dict] = {}
+    for segment in sorted(Path(output_dir).glob(SEGMENT_PATTERN)):
+        with open(segment, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["source"]] = record
+
+    return records
+
+
+def export_results(results_dir: str = "results/", output_dir: Optional[str] = None,
+                   sources: Optional[List[str]] = None) -> int:
+    """
+    Regenerate the per-article files (`_full.json`, `_extraction.json`, `_review.md`).
+
+    Args:
+        results_dir (str): Directory holding the segments.
+        output_dir (str, optional): Where to write the files. Defaults to next to
+            each input file, as `save_outputs` does.
+        sources (List[str], optional): Only export these input files.
+
+    Returns:
+        int: Number of articles exported.
+    """
+    exported = 0
+    for source, record in read_results(results_dir).items():
+        if sources is not None and source not in sources:
+            continue
+
+        base_filename = str(Path(output_dir) / Path(source).name) if output_dir else source
+        save_outputs(base_filename, {
+            "area": record["area"],
+            "extraction": record["extraction"],
+            "review_markdown": record["review_markdown"],
+        })
+        exported += 1
+
+    logger.info(f"Exported {exported} articles")
+    return exported
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import unittest
+from contextlib import asynccontextmanager
+from unittest import mock
+
+# The nodes module builds the Gemini client at import time; no call is made
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+from research_mcp_agent.agent import nodes
+from research_mcp_agent.metrics import metrics
+
+
+@asynccontextmanager
+async def no_tools():
+    yield []
+
+
+class ClassifierTiersTest(unittest.TestCase):
+    def classify(self, retrieval, agent_area):
+        """Run the classifier node with stubbed tiers: retrieval maps a tier to its (area, confidence)."""
+        metrics.reset()
+        with mock.patch.object(nodes, "_mcp_tools", no_tools), \
+                mock.patch.object(nodes, "CLASSIFIER_TIERS", ["abstract", "sections", "agent"]), \
+                mock.patch.object(nodes, "_classify_by_retrieval",
+                                  mock.AsyncMock(side_effect=lambda tier, text, tools: retrieval[tier])), \
+                mock.patch.object(nodes, "_classify_with_agent", mock.AsyncMock(return_value=agent_area)):
+            area = asyncio.run(nodes.classifier_node({"input_text": "A paper."}))["area"]
+
+        counters = metrics.snapshot()
+        hits = {tier: counters.get(f"classifier.tier.{tier}.hits", {}).get("value", 0)
+                for tier in ("abstract", "sections", "agent")}
+        return area, hits
+
+    def test_confident_retrieval_settles_the_area(self) -> None:
+        area, hits = self.classify({"abstract": ("biology", 0.9)}, agent_area=None)
+        self.assertEqual(area, "biology")
+        self.assertEqual(hits, {"abstract": 1, "sections": 0, "agent": 0})
+
+    def test_agent_settles_the_area(self) -> None:
+        area, hits = self.classify({"abstract": ("biology", 0.5), "sections": ("biology", 0.6)},
+                                   agent_area="economy")
+        self.assertEqual(area, "economy")
+        self.assertEqual(hits, {"abstract": 0, "sections": 0, "agent": 1})
+
+    def test_failed_agent_keeps_the_retrieval_area(self) -> None:
+        area, hits = self.classify({"abstract": ("biology", 0.5), "sections": (None, 0.0)}, agent_area=None)
+        self.assertEqual(area, "biology")
+        self.assertEqual(hits, {"abstract": 0, "sections": 0, "agent": 0})
+
+    def test_unclassified_when_every_tier_fails(self) -> None:
+        area, hits = self.classify({"abstract": (None, 0.0), "sections": (None, 0.0)}, agent_area=None)
+        self.assertEqual(area, "unclassified")
+        self.assertEqual(hits, {"abstract": 0, "sections": 0, "agent": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import re
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import research_mcp_agent.ingestion.benchmark as benchmark
+import research_mcp_agent.ingestion.indexer as indexer
+from tests.test_sharding import HashEmbedding
+
+RAW_ARTICLES = Path(__file__).parent.parent / "data" / "raw_articles"
+PDFS = ["biology/biology_01.pdf", "economy/economy_01.pdf"]
+
+
+class RegexSentenceTokenizer:
+    """Stand-in for Punkt, so the tests need no NLTK download."""
+
+    def span_tokenize(self, text: str):
+        return [match.span() for match in re.finditer(r"[^.!?\s][^.!?]*[.!?]?", text)]
+
+    def tokenize(self, text: str):
+        return [text[start:end] for start, end in self.span_tokenize(text)]
+
+
+class CreateTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+        self.input_dir = self.tmp / "raw"
+        for pdf in PDFS:
+            (self.input_dir / pdf).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(RAW_ARTICLES / pdf, self.input_dir / pdf)
+
+        make_indexer = indexer.make_indexer
+        patches = [
+            mock.patch.object(indexer, "_sentence_tokenizer", lambda language="english": RegexSentenceTokenizer()),
+            mock.patch.object(indexer, "make_indexer",
+                              lambda backend, path, embedding_function=None: make_indexer(backend, path,
+                                                                                          HashEmbedding())),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def create(self, **kwargs) -> None:
+        indexer.run_create(input_dir=str(self.input_dir), workers=1, persist_directory=self.tmp / "store", **kwargs)
+
+    def served_documents(self) -> set:
+        store = indexer.open_indexer(self.tmp / "store", prefer_snapshot=False)
+        try:
+            _, _, doc_ids = store.all_chunks()
+            return set(doc_ids)
+        finally:
+            store.close()
+
+    def test_second_backend_indexes_every_pdf(self) -> None:
+        self.create(backend="chroma")
+        self.assertEqual(len(self.served_documents()), len(PDFS))
+
+        self.create(backend="quantized")
+        self.assertEqual(len(self.served_documents()), len(PDFS))
+
+    def test_sharded_store_after_unsharded_one(self) -> None:
+        self.create(backend="chroma")
+        self.create(backend="chroma", shard_by="area")
+        self.assertEqual(len(self.served_documents()), len(PDFS))
+
+    def test_rerun_skips_indexed_pdfs(self) -> None:
+        self.create(backend="quantized")
+        self.create(backend="quantized")
+        self.assertEqual(len(self.served_documents()), len(PDFS))
+
+    def test_reset_keeps_the_other_backend(self) -> None:
+        self.create(backend="chroma")
+        self.create(backend="quantized", reset_db=True)
+
+        chroma = indexer.make_indexer("chroma", self.tmp / "store")
+        self.assertEqual(len(set(chroma.all_chunks()[2])), len(PDFS))
+        chroma.close()
+
+    def test_benchmark_needs_both_stores(self) -> None:
+        self.create(backend="quantized")
+
+        chroma, quantized = benchmark.ChromaIndexer, benchmark.QuantizedIndexer
+        with mock.patch.object(benchmark, "ChromaIndexer", lambda persist_directory: chroma(persist_directory,
+                                                                                              HashEmbedding())), \
+                mock.patch.object(benchmark, "QuantizedIndexer", lambda persist_directory: quantized(persist_directory,
+                                                                                                      HashEmbedding())):
+            with self.assertRaisesRegex(RuntimeError, "ChromaDB index is empty"):
+                benchmark.run_benchmark(n_queries=5, persist_directory=self.tmp / "store")
+
+            self.create(backend="chroma")
+            report = benchmark.run_benchmark(n_queries=5, n_results=3, persist_directory=self.tmp / "store")
+            self.assertGreater(report["recall@3"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import unittest
+from typing import Any, List, Optional
+from unittest import mock
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatResult
+from langchain_core.runnables import RunnableLambda
+
+# The nodes module builds the Gemini client at import time; no call is made
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+from research_mcp_agent.agent import nodes
+from research_mcp_agent.agent.prefix import PromptPrefixCache
+from research_mcp_agent.metrics import metrics
+
+ARTICLE = "Title: Gene regulation in yeast.\n\nAbstract: We study how yeast regulates its genes."
+INPUT_TOKENS = 1000
+CACHED_TOKENS = 800
+
+
+class CachingFakeModel(GenericFakeChatModel):
+    """
+    Fake chat model that records every input and reports prefix caching in its
+    usage metadata: after the first call, CACHED_TOKENS of the input are served
+    from the provider's cache.
+    """
+
+    inputs: List[List[BaseMessage]] = []
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        cached_tokens = CACHED_TOKENS if self.inputs else 0
+        self.inputs.append(list(messages))
+
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        result.generations[0].message.usage_metadata = {
+            "input_tokens": INPUT_TOKENS,
+            "output_tokens": 10,
+            "total_tokens": INPUT_TOKENS + 10,
+            "input_token_details": {"cache_read": cached_tokens},
+        }
+        return result
+
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False, **kwargs: Any) -> Any:
+        # Stands in for the provider's JSON-schema mode: the reply is the JSON document
+        parser = PydanticOutputParser(pydantic_object=schema)
+        return self | RunnableLambda(lambda raw: {"raw": raw, "parsed": parser.invoke(raw), "parsing_error": None})
+
+
+class PromptPrefixCacheTest(unittest.TestCase):
+    def test_prefix_is_built_once_per_article(self) -> None:
+        cache = PromptPrefixCache(system_prompt="system", max_entries=1)
+
+        first = cache.messages(ARTICLE, "Classify.")
+        second = cache.messages(ARTICLE, "Review.")
+        self.assertIs(first[0], second[0])
+        self.assertIs(first[1], second[1])
+        self.assertNotEqual(first[2].content, second[2].content)
+
+        cache.prefix("Another article.")
+        self.assertIsNot(cache.prefix(ARTICLE)[1], first[1])
+
+    def test_nodes_share_the_prefix_and_count_cached_tokens(self) -> None:
+        extraction = {
+            "what problem does the artcle propose to solve?": "How yeast regulates its genes.",
+            "step by step on how to solve it": ["Measure expression."],
+            "conclusion": "Regulation is local.",
+        }
+        model = CachingFakeModel(inputs=[], messages=iter([
+            AIMessage(content='{"area": "biology"}'),
+            AIMessage(content=json.dumps(extraction)),
+            AIMessage(content="# Resenha"),
+        ]))
+        cache = PromptPrefixCache()
+        state = {"input_text": ARTICLE}
+
+        async def run() -> None:
+            await nodes._classify_with_agent(state, tools=[])
+            await nodes.extractor_node(state)
+            await nodes.reviewer_node(state)
+
+        metrics.reset()
+        with mock.patch.object(nodes, "llm", model), mock.patch.object(nodes, "prefix_cache", cache), \
+                mock.patch.object(nodes, "STRUCTURED_OUTPUT_MODE", "native"):
+            asyncio.run(run())
+
+        self.assertEqual(len(model.inputs), 3)
+        prefixes = [[(type(m), m.content) for m in messages[:2]] for messages in model.inputs]
+        self.assertEqual(prefixes, [prefixes[0]] * 3)
+        self.assertIn(ARTICLE, model.inputs[0][1].content)
+        self.assertEqual(len({messages[2].content for messages in model.inputs}), 3)
+
+        self.assertEqual(cache.stats(), {
+            "input_tokens": 3 * INPUT_TOKENS,
+            "cached_tokens": 2 * CACHED_TOKENS,
+            "cached_ratio": 2 * CACHED_TOKENS / (3 * INPUT_TOKENS),
+        })
+        counters = metrics.snapshot()
+        self.assertEqual(counters["prompt_cache.prefix_misses"]["value"], 1)
+        self.assertEqual(counters["prompt_cache.prefix_hits"]["value"], 2)
+        self.assertEqual(counters["prompt_cache.classifier.cached_tokens"]["value"], 0)
+        self.assertEqual(counters["prompt_cache.extractor.cached_tokens"]["value"], CACHED_TOKENS)
+        self.assertEqual(counters["prompt_cache.reviewer.cached_tokens"]["value"], CACHED_TOKENS)
+        self.assertEqual(counters["prompt_cache.reviewer.input_tokens"]["value"], INPUT_TOKENS)
+
+
+if __name__ == "__main__":
+    unittest.main()
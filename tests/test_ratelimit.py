@@ -0,0 +1,149 @@
+import asyncio
+import time
+import unittest
+from typing import Any, List, Optional
+from unittest import mock
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatResult
+
+from research_mcp_agent.agent.ratelimit import AIMDConcurrencyController, RateLimitCallbackHandler, RateLimiter
+from research_mcp_agent.agent.ratelimit import TokenBucket
+
+
+class ResourceExhausted(Exception):
+    """What the provider raises when it throttles a call."""
+
+    status_code = 429
+
+
+class ThrottledFakeModel(GenericFakeChatModel):
+    """Fake chat model that rejects its first `throttled_calls` calls with a 429."""
+
+    throttled_calls: int = 0
+    calls: int = 0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.throttled_calls > 0:
+            self.throttled_calls -= 1
+            raise ResourceExhausted("429 RESOURCE_EXHAUSTED")
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def fake_model(limiter: RateLimiter, replies: int, throttled_calls: int = 0) -> ThrottledFakeModel:
+    return ThrottledFakeModel(
+        messages=iter([AIMessage(content="ok")] * replies),
+        throttled_calls=throttled_calls,
+        callbacks=[RateLimitCallbackHandler(limiter)],
+    )
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_refills_at_rate(self) -> None:
+        with mock.patch("research_mcp_agent.agent.ratelimit.time.monotonic", return_value=100.0) as clock:
+            bucket = TokenBucket(rate_per_minute=60)
+            bucket.consume(60)
+            self.assertAlmostEqual(bucket.wait_time(1), 1.0)
+
+            clock.return_value = 130.0
+            self.assertEqual(bucket.wait_time(30), 0.0)
+            self.assertAlmostEqual(bucket.wait_time(31), 1.0)
+
+    def test_never_waits_for_more_than_capacity(self) -> None:
+        with mock.patch("research_mcp_agent.agent.ratelimit.time.monotonic", return_value=0.0):
+            bucket = TokenBucket(rate_per_minute=60, capacity=10)
+            self.assertEqual(bucket.wait_time(1000), 0.0)
+
+    def test_acquire_waits_for_the_request_bucket(self) -> None:
+        limiter = RateLimiter(requests_per_minute=600)
+        limiter.requests.tokens = 0
+
+        waited = asyncio.run(limiter.acquire(estimated_tokens=1))
+        self.assertGreaterEqual(waited, 0.09)
+        self.assertEqual(limiter.controller.in_flight, 1)
+
+    def test_share_splits_the_budget(self) -> None:
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1200)
+        limiter.share(4)
+        self.assertAlmostEqual(limiter.requests.rate * 60, 15)
+        self.assertAlmostEqual(limiter.tokens.rate * 60, 300)
+
+
+class AIMDTest(unittest.TestCase):
+    def test_shrinks_on_throttling_and_grows_on_success(self) -> None:
+        controller = AIMDConcurrencyController(initial_limit=8, max_limit=16)
+
+        controller.on_result(latency=1.0, throttled=True)
+        self.assertEqual(controller.limit, 4)
+
+        for _ in range(4):
+            controller.on_result(latency=1.0, throttled=False)
+        self.assertGreater(controller.limit, 4.8)
+        self.assertLess(controller.limit, 5.0)
+
+    def test_slow_calls_shrink_gently(self) -> None:
+        controller = AIMDConcurrencyController(initial_limit=10, latency_target=5.0)
+        controller.on_result(latency=10.0, throttled=False)
+        self.assertAlmostEqual(controller.limit, 9.0)
+
+    def test_limit_stays_within_bounds(self) -> None:
+        controller = AIMDConcurrencyController(initial_limit=2, min_limit=1, max_limit=3)
+        for _ in range(5):
+            controller.on_result(latency=1.0, throttled=True)
+        self.assertEqual(controller.limit, 1)
+        for _ in range(50):
+            controller.on_result(latency=1.0, throttled=False)
+        self.assertEqual(controller.limit, 3)
+
+
+class FakeModelTest(unittest.TestCase):
+    def test_429_shrinks_the_limit(self) -> None:
+        limiter = RateLimiter(controller=AIMDConcurrencyController(initial_limit=8))
+        model = fake_model(limiter, replies=1, throttled_calls=1)
+
+        with self.assertRaises(ResourceExhausted):
+            asyncio.run(model.ainvoke("hello"))
+
+        self.assertEqual(limiter.controller.limit, 4)
+        self.assertEqual(limiter.controller.in_flight, 0)
+
+    def test_retries_are_seen_by_the_limiter(self) -> None:
+        limiter = RateLimiter(controller=AIMDConcurrencyController(initial_limit=8))
+        model = fake_model(limiter, replies=1, throttled_calls=2)
+
+        # Retried outside the model, as the nodes do, so each attempt is admitted and reported
+        reply = asyncio.run(model.with_retry(stop_after_attempt=3, wait_exponential_jitter=False).ainvoke("hello"))
+
+        self.assertEqual(reply.content, "ok")
+        self.assertEqual(model.calls, 3)
+        self.assertAlmostEqual(limiter.controller.limit, 2 + 1 / 2)
+        self.assertEqual(limiter.controller.in_flight, 0)
+
+    def test_concurrency_is_capped_by_the_limit(self) -> None:
+        limiter = RateLimiter(controller=AIMDConcurrencyController(initial_limit=2, max_limit=2))
+        model = fake_model(limiter, replies=6)
+        peak = 0
+
+        original = ThrottledFakeModel._generate
+
+        def slow_generate(self: ThrottledFakeModel, *args: Any, **kwargs: Any) -> ChatResult:
+            nonlocal peak
+            peak = max(peak, limiter.controller.in_flight)
+            time.sleep(0.05)
+            return original(self, *args, **kwargs)
+
+        async def run() -> None:
+            await asyncio.gather(*(model.ainvoke("hello") for _ in range(6)))
+
+        with mock.patch.object(ThrottledFakeModel, "_generate", slow_generate):
+            asyncio.run(run())
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(limiter.controller.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from typing import Any, Dict, List
+
+from research_mcp_agent.ingestion.indexer import query_articles
+
+
+class FakeIndexer:
+    """Store ranking the chunks in the given order, so the first article's chunks crowd the top."""
+
+    def __init__(self, chunks_per_article: Dict[str, int]) -> None:
+        self.chunks = [(f"{filename}:{i}", filename)
+                       for filename, n_chunks in chunks_per_article.items() for i in range(n_chunks)]
+        self.requests: List[int] = []
+
+    def query(self, query_texts: List[str], n_results: int = 1, **kwargs: Any) -> Dict[str, Any]:
+        self.requests.append(n_results)
+        top = self.chunks[:n_results]
+        return {
+            "ids": [chunk_id for chunk_id, _ in top],
+            "filename": [filename for _, filename in top],
+            "scores": [-float(rank) for rank in range(len(top))],
+            "documents": [""] * len(top),
+        }
+
+
+class QueryArticlesTest(unittest.TestCase):
+    def test_fetches_more_until_enough_articles(self) -> None:
+        store = FakeIndexer({"long.pdf": 40, "b.pdf": 3, "c.pdf": 3})
+
+        articles = query_articles(store, "query", n_articles=3, overfetch_factor=5)
+
+        self.assertEqual([article["filename"] for article in articles], ["long.pdf", "b.pdf", "c.pdf"])
+        self.assertEqual(store.requests, [15, 30, 60])
+
+    def test_single_fetch_when_enough(self) -> None:
+        store = FakeIndexer({"a.pdf": 2, "b.pdf": 2, "c.pdf": 2})
+        self.assertEqual(len(query_articles(store, "query", n_articles=2)), 2)
+        self.assertEqual(store.requests, [10])
+
+    def test_stops_when_the_store_runs_out(self) -> None:
+        store = FakeIndexer({"long.pdf": 12, "b.pdf": 1})
+
+        articles = query_articles(store, "query", n_articles=3, overfetch_factor=2)
+
+        self.assertEqual(len(articles), 2)
+        self.assertEqual(store.requests, [6, 12, 24])
+
+
+if __name__ == "__main__":
+    unittest.main()
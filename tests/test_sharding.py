@@ -0,0 +1,77 @@
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from research_mcp_agent.ingestion.indexer import ChunkRecord, make_indexer
+from research_mcp_agent.ingestion.sharding import ShardedIndexer
+
+DOCUMENTS = {
+    "d1": {"area": "biology", "filename": "b.pdf", "title": "Cells"},
+    "d2": {"area": "economy", "filename": "e.pdf", "title": "Growth"},
+}
+CHUNKS = [
+    ChunkRecord("d1-0", "d1", 0, 0, 24, "protein folding in cells"),
+    ChunkRecord("d2-0", "d2", 0, 0, 24, "gdp growth and inflation"),
+]
+
+
+class HashEmbedding(EmbeddingFunction):
+    """Bag-of-words hashing embedder, so the tests need no model download."""
+
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = np.zeros(32, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 32] += 1
+            vectors.append(vector / (np.linalg.norm(vector) or 1))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "hash-embedding"
+
+    def get_config(self) -> dict:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbedding":
+        return HashEmbedding()
+
+
+def open_store(path: Path, reset=()) -> ShardedIndexer:
+    return ShardedIndexer(path, "area", lambda shard: make_indexer("chroma", shard, HashEmbedding()), reset=reset)
+
+
+def build(path: Path) -> None:
+    store = open_store(path)
+    store.create_collection(DOCUMENTS, CHUNKS)
+    store.build_lexical_index()
+    store.close()
+
+
+class ShardResetTest(unittest.TestCase):
+    def test_reset_then_create(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build(Path(tmp))
+
+            for _ in range(2):
+                store = open_store(Path(tmp), reset=["biology"])
+                store.create_collection({"d1": DOCUMENTS["d1"]}, CHUNKS[:1])
+                store.shard("biology").build_lexical_index()
+
+                self.assertEqual(store.shard("biology").collection.count(), 1)
+                self.assertEqual(store.shard("economy").collection.count(), 1)
+                self.assertEqual(store.query(["protein folding"], 1, mode="hybrid")["area"], ["biology"])
+                store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
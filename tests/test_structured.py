@@ -0,0 +1,58 @@
+import unittest
+
+from research_mcp_agent.agent.schemas import ClassifierResponse, ExtractionResponse
+from research_mcp_agent.agent.structured import StructuredOutputRepairError, parse_structured, repair_json
+
+
+class RepairJsonTest(unittest.TestCase):
+    def test_valid_json_is_unchanged(self) -> None:
+        self.assertEqual(repair_json('{"a": [1, 2]}'), {"a": [1, 2]})
+
+    def test_strips_fences_and_prose(self) -> None:
+        text = 'Here is the answer:\n```json\n{"area": "biology"}\n```\nHope it helps.'
+        self.assertEqual(repair_json(text), {"area": "biology"})
+
+    def test_trailing_commas(self) -> None:
+        self.assertEqual(repair_json('{"a": ["x", "y",], "b": 1,}'), {"a": ["x", "y"], "b": 1})
+
+    def test_python_literals(self) -> None:
+        self.assertEqual(repair_json('{"done": True, "rest": [None, False]}'),
+                         {"done": True, "rest": [None, False]})
+
+    def test_truncated_output(self) -> None:
+        self.assertEqual(repair_json('{"a": {"b": "unfinished'), {"a": {"b": "unfinished"}})
+
+    def test_truncated_after_a_comma(self) -> None:
+        self.assertEqual(repair_json('{"a": ["x", "y",'), {"a": ["x", "y"]})
+
+    def test_raw_newlines_in_strings(self) -> None:
+        self.assertEqual(repair_json('{"conclusion": "first line\nsecond line"}'),
+                         {"conclusion": "first line\nsecond line"})
+
+    def test_unrepairable(self) -> None:
+        with self.assertRaises(StructuredOutputRepairError):
+            repair_json('{"a": 1 "b": 2}')
+
+
+class ParseStructuredTest(unittest.TestCase):
+    def test_bare_answer_for_a_single_field(self) -> None:
+        self.assertEqual(parse_structured("`biology`\n", ClassifierResponse).area, "biology")
+
+    def test_bare_answer_needs_a_single_field(self) -> None:
+        with self.assertRaises(StructuredOutputRepairError):
+            parse_structured("The article solves a problem.", ExtractionResponse)
+
+    def test_empty_answer(self) -> None:
+        with self.assertRaises(StructuredOutputRepairError):
+            parse_structured("  ", ClassifierResponse)
+
+    def test_keys_and_list_fields_are_aligned(self) -> None:
+        text = ('{"What problem does the article propose to solve?": "p",\n'
+                ' "step by step on how to solve it": "- one\n- two",\n'
+                ' "Conclusion": "c",')
+        response = parse_structured(text, ExtractionResponse)
+        self.assertEqual((response.problem, response.steps, response.conclusion), ("p", ["one", "two"], "c"))
+
+
+if __name__ == "__main__":
+    unittest.main()